@@ -0,0 +1,51 @@
+import argparse
+import json
+import sys
+
+
+def compare(baseline, current, threshold):
+    # Returns the stages whose minimum time grew by more than threshold
+    regressions = []
+    print(f"{'stage':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            print(f"{name:<24} {'-':>12} {result['min'] * 1000:>10.2f}ms {'new':>8}")
+            continue
+        change = result["min"] / base["min"] - 1 if base["min"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<24} {base['min'] * 1000:>10.2f}ms {result['min'] * 1000:>10.2f}ms "
+            f"{change:>+7.1%}{flag}"
+        )
+    if baseline["meta"].get("pages") != current["meta"].get("pages"):
+        print("Warning: baseline and current runs used different corpus sizes")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare benchmark results against a saved baseline"
+    )
+    parser.add_argument("baseline", help="Baseline JSON from benchmarks/run.py")
+    parser.add_argument("current", help="Current JSON from benchmarks/run.py")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown that counts as a regression (default 0.10)",
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions")
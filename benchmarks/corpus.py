@@ -0,0 +1,112 @@
+import os
+import random
+import shutil
+
+# Relative weights of each block type in a generated page
+DEFAULT_MIX = {
+    "heading": 2,
+    "paragraph": 6,
+    "unordered_list": 2,
+    "ordered_list": 1,
+    "quote": 1,
+    "code": 1,
+}
+
+WORDS = (
+    "middle earth ring fellowship shire hobbit wizard elves dwarves mordor "
+    "journey quest river mountain forest tower king return shadow light"
+).split()
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title> {{ Title }} </title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+</html>
+"""
+
+
+class CorpusGenerator:
+    # Seeded generator of a synthetic site: content/ with N pages spread over
+    # directories up to `depth` levels deep, a static/ tree and a template
+    def __init__(
+        self, seed=0, mix=None, blocks_per_page=40, links=0.3, images=0.1
+    ):
+        self.random = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.blocks_per_page = blocks_per_page
+        self.links = links
+        self.images = images
+
+    def sentence(self, words=12):
+        parts = []
+        for _ in range(words):
+            roll = self.random.random()
+            word = self.random.choice(WORDS)
+            if roll < self.links / words:
+                parts.append(f"[{word}](/{self.random.choice(WORDS)})")
+            elif roll < (self.links + self.images) / words:
+                parts.append(f"![{word}](/images/{self.random.choice(WORDS)}.png)")
+            elif roll < 0.1:
+                parts.append(f"**{word}**")
+            elif roll < 0.15:
+                parts.append(f"*{word}*")
+            elif roll < 0.18:
+                parts.append(f"`{word}`")
+            else:
+                parts.append(word)
+        return " ".join(parts)
+
+    def block(self, kind):
+        if kind == "heading":
+            return "#" * self.random.randint(2, 6) + " " + self.sentence(4)
+        if kind == "paragraph":
+            count = self.random.randint(1, 4)
+            return "\n".join(self.sentence() for _ in range(count))
+        if kind == "unordered_list":
+            count = self.random.randint(2, 6)
+            return "\n".join(f"* {self.sentence(6)}" for _ in range(count))
+        if kind == "ordered_list":
+            count = self.random.randint(2, 6)
+            return "\n".join(f"{i}. {self.sentence(6)}" for i in range(1, count + 1))
+        if kind == "quote":
+            count = self.random.randint(1, 3)
+            return "\n".join(f"> {self.sentence()}" for _ in range(count))
+        if kind == "code":
+            lines = [f"print({self.random.choice(WORDS)!r})" for _ in range(4)]
+            return "```\n" + "\n".join(lines) + "\n```"
+        raise ValueError(f"Unknown block kind: {kind}")
+
+    def page(self, title):
+        kinds = self.random.choices(
+            list(self.mix), weights=list(self.mix.values()), k=self.blocks_per_page
+        )
+        blocks = [f"# {title}"] + [self.block(kind) for kind in kinds]
+        return "\n\n".join(blocks) + "\n"
+
+    def write_site(self, root, pages, depth=2, static_files=20, static_bytes=4096):
+        shutil.rmtree(root, ignore_errors=True)
+        content = os.path.join(root, "content")
+        static = os.path.join(root, "static")
+        for i in range(pages):
+            parts = [f"section{self.random.randrange(4)}" for _ in range(depth)]
+            directory = os.path.join(content, *parts[: self.random.randint(0, depth)])
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"page{i}.md"), "w") as f:
+                f.write(self.page(f"Page {i}"))
+        os.makedirs(os.path.join(static, "images"))
+        for i in range(static_files):
+            with open(os.path.join(static, "images", f"image{i}.png"), "wb") as f:
+                f.write(self.random.randbytes(static_bytes))
+        with open(os.path.join(static, "index.css"), "w") as f:
+            f.write("body { font-family: serif; }\n")
+        with open(os.path.join(root, "template.html"), "w") as f:
+            f.write(TEMPLATE)
+        return content, static, os.path.join(root, "template.html")
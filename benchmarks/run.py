@@ -0,0 +1,225 @@
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "..", "src"))
+
+import main as site_main  # noqa: E402
+from build_client import request  # noqa: E402
+from copy_static import copy_static, sync_static  # noqa: E402
+from corpus import CorpusGenerator, DEFAULT_MIX  # noqa: E402
+from daemon import BuildDaemon  # noqa: E402
+from generate_page import collect_pages, generate_page  # noqa: E402
+from helpers import (  # noqa: E402
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    render_block,
+    split_front_matter,
+    text_to_textnodes,
+    tokenize_inline,
+)
+from manifest import Manifest, MANIFEST_NAME  # noqa: E402
+from plan import plan_build  # noqa: E402
+from site_index import SiteIndex, SITE_INDEX_NAME  # noqa: E402
+
+
+BLOCK_MARKER_PATTERN = re.compile(r"^(#{1,6} |> |[*-] |\d+\. )")
+
+# Stages that render pages in this process, timed from an empty block memo
+COLD_STAGES = ("generate_page", "main", "main_pipeline", "incremental_page")
+
+
+def time_stage(function, repeat, setup=None):
+    # Returns the timings of `repeat` runs; output printed by the build is
+    # discarded so it doesn't skew the numbers. setup runs untimed before
+    # each run.
+    timings = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(root, pages, seed, depth, repeat, mix=None):
+    generator = CorpusGenerator(seed=seed, mix=mix)
+    content, static, template = generator.write_site(root, pages, depth=depth)
+    public = os.path.join(root, "public")
+    state = os.path.join(root, "state")
+    os.makedirs(public, exist_ok=True)
+    page_paths = collect_pages(content, public)
+
+    markdowns = []
+    for from_path, _ in page_paths:
+        with open(from_path) as f:
+            markdowns.append(split_front_matter(f.read())[1])
+    blocks = [
+        block for markdown in markdowns for block in markdown_to_blocks(markdown)
+    ]
+    # Inline text as the block builders pass it in, minus the block markers
+    inline_texts = [
+        BLOCK_MARKER_PATTERN.sub("", line.strip())
+        for block in blocks
+        if not block.startswith("```")
+        for line in block.split("\n")
+    ]
+    nodes = [markdown_to_html_node(markdown) for markdown in markdowns]
+
+    def build_pages():
+        for from_path, dest_path in page_paths:
+            generate_page(from_path, template, dest_path)
+
+    def copy_fresh(copy):
+        def run():
+            destination = tempfile.mkdtemp(dir=root)
+            copy(static, destination)
+
+        return run
+
+    def full_build(options=()):
+        site_main.STATIC_DIR = static
+        site_main.CONTENT_DIR = content
+        site_main.TEMPLATE_PATH = template
+        site_main.PUBLIC_DIR = public
+        site_main.CACHE_DIR = os.path.join(root, "cache")
+        site_main.STATE_DIR = state
+        # No render cache and, via COLD_STAGES, an empty block memo, so every
+        # run measures a full parse
+        site_main.main(["--no-cache", *options])
+
+    edited_page = page_paths[0][0]
+
+    def edit_page():
+        # Each run of the rebuild stages has exactly one changed page
+        with open(edited_page, "a") as f:
+            f.write("\nEdited.\n")
+
+    def incremental_page():
+        edit_page()
+        site_main.main(["--incremental", "--no-cache"])
+
+    def daemon_page():
+        edit_page()
+        request(socket_path, "build")
+
+    stages = {
+        "markdown_to_blocks": lambda: [markdown_to_blocks(m) for m in markdowns],
+        "block_to_block_type": lambda: [block_to_block_type(b) for b in blocks],
+        "text_to_textnodes": lambda: [text_to_textnodes(t) for t in inline_texts],
+        "tokenize_inline": lambda: [tokenize_inline(t) for t in inline_texts],
+        "markdown_to_html_node": lambda: [
+            markdown_to_html_node(m) for m in markdowns
+        ],
+        "to_html": lambda: [node.to_html() for node in nodes],
+        "generate_page": build_pages,
+        "plan_build": lambda: plan_build(content, static, public),
+        "copy_static": copy_fresh(copy_static),
+        "sync_static": copy_fresh(sync_static),
+        "main": full_build,
+        "main_pipeline": lambda: full_build(["--pipeline"]),
+    }
+    results = {}
+
+    def record(name, function):
+        # The block memo is process-wide, so without clearing it every run
+        # after the first would reuse the blocks earlier stages rendered
+        setup = render_block.cache_clear if name in COLD_STAGES else None
+        timings = time_stage(function, repeat, setup)
+        results[name] = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "runs": len(timings),
+        }
+        print(f"{name:<24} min {min(timings) * 1000:10.2f} ms")
+
+    for name, function in stages.items():
+        record(name, function)
+
+    # Warm single-page rebuilds, against the site the main stage built: a new
+    # process per build versus a request to a build daemon
+    record("incremental_page", incremental_page)
+    socket_path = os.path.join(root, "build.sock")
+    daemon = BuildDaemon(
+        content,
+        static,
+        template,
+        public,
+        Manifest.load(os.path.join(state, MANIFEST_NAME)),
+        site_index=SiteIndex.load(os.path.join(state, SITE_INDEX_NAME)),
+        site_url=site_main.SITE_URL,
+    )
+    daemon.listen(socket_path)
+    thread = threading.Thread(target=daemon.serve_forever)
+    with redirect_stdout(io.StringIO()):
+        thread.start()
+        # Answered once the daemon is serving, after its startup message
+        request(socket_path, "status")
+    record("daemon_page", daemon_page)
+    with redirect_stdout(io.StringIO()):
+        request(socket_path, "stop")
+        thread.join()
+    return {
+        "meta": {
+            "pages": pages,
+            "seed": seed,
+            "depth": depth,
+            "repeat": repeat,
+            "mix": mix or DEFAULT_MIX,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": results,
+    }
+
+
+def parse_mix(value):
+    # "paragraph=6,code=2" overrides those weights of the default mix
+    mix = dict(DEFAULT_MIX)
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in mix:
+            raise argparse.ArgumentTypeError(f"Unknown block type: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each stage of the build")
+    parser.add_argument("--pages", type=int, default=200, help="Pages to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument(
+        "--depth", type=int, default=2, help="Maximum content directory depth"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        help="Block type weights, e.g. paragraph=6,code=2,quote=1",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage")
+    parser.add_argument(
+        "--output", default="bench_results.json", help="Where to write the JSON"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        report = run_benchmarks(
+            root, args.pages, args.seed, args.depth, args.repeat, args.mix
+        )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,78 @@
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def worker(urls, requests, results, lock):
+    # Each worker issues its share of requests round-robin over the URLs
+    latencies = []
+    errors = 0
+    for i in range(requests):
+        url = urls[i % len(urls)]
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+            path = url.path or "/"
+            conn.request("GET", path + ("?" + url.query if url.query else ""))
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status >= 400:
+                errors += 1
+        except OSError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    with lock:
+        results["latencies"].extend(latencies)
+        results["errors"] += errors
+
+
+def run(urls, requests, concurrency):
+    urls = [urlsplit(url) for url in urls]
+    results = {"latencies": [], "errors": 0}
+    lock = threading.Lock()
+    per_worker = [requests // concurrency] * concurrency
+    for i in range(requests % concurrency):
+        per_worker[i] += 1
+    threads = [
+        threading.Thread(target=worker, args=(urls, count, results, lock))
+        for count in per_worker
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results["latencies"])
+    print(f"{len(latencies)} requests in {elapsed:.2f}s with {concurrency} clients")
+    print(f"Requests per second: {len(latencies) / elapsed:.1f}")
+    print(f"Errors: {results['errors']}")
+    if latencies:
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        print(f"Latency p50: {p50:.2f} ms, p99: {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure requests per second against a running server.py"
+    )
+    parser.add_argument(
+        "urls",
+        nargs="*",
+        default=["http://localhost:8888/", "http://localhost:8888/index.css"],
+        help="URLs to request round-robin",
+    )
+    parser.add_argument(
+        "-n", "--requests", type=int, default=2000, help="Total requests"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=16, help="Concurrent clients"
+    )
+    args = parser.parse_args()
+
+    run(args.urls, args.requests, args.concurrency)
@@ -1,18 +1,314 @@
+import io
+import json
 import os
 import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import queue
+import re
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+LIVERELOAD_PATH = "/__livereload"
+# Static files copied by the build with --fingerprint, e.g. index.0123456789.css;
+# their content never changes, so clients may cache them indefinitely
+FINGERPRINTED_PATTERN = re.compile(r"\.[0-9a-f]{10}\.[^./]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Comment lines sent on idle event streams so proxies and browsers keep them open
+KEEPALIVE_SECONDS = 15
+
+# Reloads the page when the build reports that this page's output changed
+LIVERELOAD_SCRIPT = b"""<script>
+(function () {
+  var page = decodeURI(location.pathname);
+  if (page.endsWith("/")) page += "index.html";
+  new EventSource("/__livereload").onmessage = function (event) {
+    if (JSON.parse(event.data).indexOf(page) !== -1) location.reload();
+  };
+})();
+</script>
+"""
+
+
+class FileCache:
+    # LRU cache of file contents keyed by path; an entry is only reused while
+    # the file's mtime and size are unchanged. Files larger than
+    # max_file_bytes are never cached and are streamed from disk instead.
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_bytes // 8
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, file_stat):
+        version = (file_stat.st_mtime_ns, file_stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                return entry[1]
+        with open(path, "rb") as f:
+            body = f.read()
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[path] = (version, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return body
+
+
+class CachingHTTPServer(ThreadingHTTPServer):
+    # Concurrent server sharing one FileCache between its handlers. With
+    # workers set, requests run on a bounded thread pool rather than on a new
+    # thread each, so a burst of clients can't exhaust the machine.
+    request_queue_size = 128
+
+    def __init__(
+        self, server_address, handler_class, workers=None, cache_bytes=64 << 20
+    ):
+        super().__init__(server_address, handler_class)
+        self.file_cache = FileCache(cache_bytes)
+        self.executor = ThreadPoolExecutor(workers) if workers else None
+
+    def process_request(self, request, client_address):
+        if self.executor is None:
+            super().process_request(request, client_address)
+        else:
+            self.executor.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class CachingHandler(SimpleHTTPRequestHandler):
+    # Serves regular files from the server's FileCache with ETag and
+    # Last-Modified validators, answering 304 when the client's copy is current.
+    # Pre-compressed siblings written by the build (index.css.br/.gz) are
+    # served instead of the original when the client accepts that encoding.
+    serve_precompressed = True
+
+    def send_head(self):
+        url_path = urlsplit(self.path).path
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url_path.endswith("/"):
+                return super().send_head()  # Redirect to the trailing slash
+            path = os.path.join(path, "index.html")
+        cache = getattr(self.server, "file_cache", None)
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return super().send_head()  # 404 or directory listing
+        if not stat.S_ISREG(file_stat.st_mode) or (
+            cache is not None and file_stat.st_size > cache.max_file_bytes
+        ):
+            return super().send_head()
+
+        content_type = self.guess_type(path)
+        encoding, has_variants = None, False
+        if self.serve_precompressed:
+            encoding, has_variants, path, file_stat = self.choose_encoding(
+                path, file_stat
+            )
+
+        etag = f'"{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"'
+        last_modified = formatdate(file_stat.st_mtime, usegmt=True)
+        cache_control = self.cache_control(url_path)
+        if self.is_not_modified(etag, file_stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            if has_variants:
+                self.send_header("Vary", "Accept-Encoding")
+            if cache_control is not None:
+                self.send_header("Cache-Control", cache_control)
+            self.end_headers()
+            return None
+
+        if cache is not None:
+            body = cache.get(path, file_stat)
+        else:
+            with open(path, "rb") as f:
+                body = f.read()
+        if encoding is None:
+            body = self.filter_body(path, body)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if has_variants:
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        if cache_control is not None:
+            self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def cache_control(self, url_path):
+        if FINGERPRINTED_PATTERN.search(url_path):
+            return IMMUTABLE_CACHE_CONTROL
+        return None
+
+    def choose_encoding(self, path, file_stat):
+        # Returns (encoding, has_variants, path, stat) for the best up-to-date
+        # variant the client accepts, or the original file's path and stat
+        accepted = self.accepted_encodings()
+        has_variants = False
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            try:
+                variant_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            # The build stamps variants with their source's mtime
+            if variant_stat.st_mtime_ns != file_stat.st_mtime_ns:
+                continue
+            has_variants = True
+            if encoding in accepted:
+                return encoding, True, path + suffix, variant_stat
+        return None, has_variants, path, file_stat
+
+    def accepted_encodings(self):
+        accepted = set()
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = item.strip().partition(";")
+            params = params.replace(" ", "")
+            if name and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.add(name.lower())
+        return accepted
+
+    def is_not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or "W/" + etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def filter_body(self, path, body):
+        # Hook for subclasses that rewrite responses; cached bytes are unchanged
+        return body
+
+
+class LiveReloadHub:
+    # Fans out lists of changed output paths to every connected browser
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = set()
+
+    def subscribe(self):
+        client = queue.Queue()
+        with self._lock:
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def broadcast(self, paths):
+        with self._lock:
+            for client in self._clients:
+                client.put(paths)
+
+
+class LiveReloadHandler(CachingHandler):
+    # Serves a Server-Sent Events stream at /__livereload, accepts change
+    # notifications from the build as a POSTed JSON list of paths, and injects
+    # the reload client into every HTML page it serves
+    hub = LiveReloadHub()
+    # Pages are rewritten to inject the reload client, so always send originals
+    serve_precompressed = False
+
+    def do_GET(self):
+        if urlsplit(self.path).path == LIVERELOAD_PATH:
+            self.serve_events()
+        else:
+            super().do_GET()
+
+    def do_POST(self):
+        if urlsplit(self.path).path != LIVERELOAD_PATH:
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            paths = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_error(400, "Expected a JSON list of paths")
+            return
+        self.hub.broadcast(paths)
+        self.send_response(204)
+        self.end_headers()
+
+    def serve_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        client = self.hub.subscribe()
+        try:
+            while True:
+                try:
+                    paths = client.get(timeout=KEEPALIVE_SECONDS)
+                    message = f"data: {json.dumps(paths)}\n\n"
+                except queue.Empty:
+                    message = ": keepalive\n\n"
+                self.wfile.write(message.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.hub.unsubscribe(client)
+
+    def filter_body(self, path, body):
+        if path.endswith(".html"):
+            return inject_live_reload(body)
+        return body
+
+    def cache_control(self, url_path):
+        return None  # end_headers sends no-cache for everything
+
+    def end_headers(self):
+        # Always revalidate so a reload picks up the rebuilt page
+        self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+
+def inject_live_reload(html):
+    index = html.lower().rfind(b"</body>")
+    if index == -1:
+        return html + LIVERELOAD_SCRIPT
+    return html[:index] + LIVERELOAD_SCRIPT + html[index:]
 
 
 def run(
     server_class=HTTPServer,
-    handler_class=SimpleHTTPRequestHandler,
+    handler_class=CachingHandler,
     port=8888,
     directory=None,
+    **server_kwargs,
 ):
     if directory:  # Change the current working directory if directory is specified
         os.chdir(directory)
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
+    httpd = server_class(server_address, handler_class, **server_kwargs)
     print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
     httpd.serve_forever()
 
@@ -23,6 +319,46 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--live-reload",
+        action="store_true",
+        help=f"Reload pages in the browser when the build POSTs to {LIVERELOAD_PATH}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Serve concurrently on a pool of this many threads with an "
+        "in-memory file cache (0 keeps the single-threaded server)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=64,
+        help="Size cap of the in-memory file cache in MiB",
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    cache_bytes = args.cache_size << 20
+    if args.live_reload:
+        # Event streams stay open, so each connection needs its own thread
+        run(
+            server_class=CachingHTTPServer,
+            handler_class=LiveReloadHandler,
+            port=args.port,
+            directory=args.dir,
+            cache_bytes=cache_bytes,
+        )
+    elif args.workers > 0:
+        run(
+            server_class=CachingHTTPServer,
+            handler_class=CachingHandler,
+            port=args.port,
+            directory=args.dir,
+            workers=args.workers,
+            cache_bytes=cache_bytes,
+        )
+    else:
+        # Still CachingHandler, without the file cache: validators and
+        # pre-compressed variants work in the default single-threaded mode too
+        run(port=args.port, directory=args.dir)
@@ -0,0 +1,24 @@
+import os
+
+
+def write_atomic(path, chunks, mode="w", times_ns=None):
+    # Write chunks (str, or bytes with mode="wb") to a temporary file next to
+    # path and rename it into place, so an interrupted build never leaves a
+    # truncated file behind and readers see the old file or the new one.
+    # The temporary name includes the process ID, since worker processes may
+    # write the same path at once. times_ns, an (atime, mtime) pair in
+    # nanoseconds, is set before the file appears.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        if times_ns is not None:
+            os.utime(tmp_path, ns=times_ns)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,63 @@
+import argparse
+import json
+import socket
+import sys
+
+# Where `main.py --daemon` listens unless given --socket. Kept here rather
+# than in main.py so the client starts without importing the build.
+SOCKET_PATH = "/Users/derek/code/staticsitegen/.cache/build.sock"
+
+COMMANDS = ("build", "status", "stop")
+
+
+def request(socket_path, command, log=None):
+    # Sends one command to the build daemon and returns its final reply.
+    # The daemon streams the build's output as {"log": line} messages, which
+    # are passed to log as they arrive.
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({"command": command}).encode() + b"\n")
+        with sock.makefile("rb") as replies:
+            for line in replies:
+                message = json.loads(line)
+                if "log" not in message:
+                    return message
+                if log is not None:
+                    log(message["log"])
+    raise ConnectionError("Build daemon closed the connection without a reply")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ask a running `main.py --daemon` to rebuild changed outputs"
+    )
+    parser.add_argument("command", nargs="?", default="build", choices=COMMANDS)
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Daemon socket path")
+    parser.add_argument(
+        "--quiet", "-q", action="store_true", help="Only print the summary"
+    )
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else print
+    try:
+        reply = request(args.socket, args.command, log)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No build daemon listening on {args.socket}", file=sys.stderr)
+        return 2
+    if reply.get("error"):
+        print(f"Build failed: {reply['error']}", file=sys.stderr)
+        return 1
+    if args.command == "build":
+        print(
+            f"Rebuilt {reply['outputs']} output(s) in {reply['elapsed_ms']:.1f} ms"
+        )
+    elif args.command == "status":
+        print(
+            f"Daemon {reply['pid']} tracking {reply['outputs']} outputs, "
+            f"{reply['builds']} build(s) since start"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
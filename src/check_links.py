@@ -0,0 +1,91 @@
+import os
+import time
+from urllib.parse import unquote, urlsplit
+
+
+def resolve_target(target, page_output, public_dir):
+    # Output path an internal link or image points at, or None for external
+    # URLs and same-page anchors. Root-relative targets resolve against
+    # public_dir, others against the directory of the page's output.
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        resolved = os.path.join(public_dir, path.lstrip("/"))
+    else:
+        resolved = os.path.join(os.path.dirname(page_output), path)
+    return os.path.normpath(resolved)
+
+
+def find_broken_links(site_index, outputs, public_dir):
+    # Checks every link and image target recorded in the site index against
+    # the set of files the build wrote or copied; one set lookup per target
+    # (two for directory links, which are served as their index.html).
+    # Returns (source, target, kind) for each broken target, in page order.
+    existing = {os.path.normpath(output) for output in outputs}
+    public_dir = os.path.normpath(public_dir)
+    # Whether each root-relative target is broken doesn't depend on the page
+    # linking to it, and shared navigation links repeat on every page
+    absolute = {}
+    broken = []
+    for source in sorted(site_index.pages):
+        page = site_index.pages[source]
+        for kind in ("links", "images"):
+            for target in page[kind]:
+                if target.startswith("/"):
+                    is_broken = absolute.get(target)
+                    if is_broken is None:
+                        resolved = resolve_target(target, page["output"], public_dir)
+                        is_broken = _is_broken(resolved, existing)
+                        absolute[target] = is_broken
+                else:
+                    resolved = resolve_target(target, page["output"], public_dir)
+                    is_broken = _is_broken(resolved, existing)
+                if is_broken:
+                    broken.append((source, target, kind[:-1]))
+    return broken
+
+
+def _is_broken(resolved, existing):
+    if resolved is None or resolved in existing:
+        return False
+    return os.path.join(resolved, "index.html") not in existing
+
+
+def _target_lines(source, targets):
+    # Line numbers of each target's occurrences in the markdown source. Only
+    # pages with broken links are read again, so this stays off the fast path.
+    lines = {target: [] for target in targets}
+    with open(source) as f:
+        for number, line in enumerate(f, 1):
+            for target in targets:
+                for _ in range(line.count(f"]({target})")):
+                    lines[target].append(number)
+    return lines
+
+
+def check_links(site_index, outputs, public_dir):
+    # Prints every broken internal link and image as "source:line: target"
+    # and returns how many were found
+    start = time.perf_counter()
+    broken = find_broken_links(site_index, outputs, public_dir)
+    by_source = {}
+    for source, target, kind in broken:
+        by_source.setdefault(source, []).append((target, kind))
+    for source, targets in by_source.items():
+        lines = _target_lines(source, {target for target, _ in targets})
+        for target, kind in targets:
+            # Pop so repeated targets are matched to successive occurrences
+            line = lines[target].pop(0) if lines[target] else "?"
+            print(f"{source}:{line}: broken {kind} {target}")
+    checked = sum(
+        len(page["links"]) + len(page["images"])
+        for page in site_index.pages.values()
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Checked {checked} links and images in {len(site_index.pages)} pages: "
+        f"{len(broken)} broken in {elapsed:.2f}s"
+    )
+    return len(broken)
@@ -0,0 +1,72 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic import write_atomic
+from constants import COMPRESSIBLE_EXTENSIONS, COMPRESS_MIN_BYTES
+
+try:
+    import brotli
+except ImportError:  # Optional; only gzip variants are written without it
+    brotli = None
+
+
+def _encoders():
+    encoders = [(".gz", lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda data: brotli.compress(data)))
+    return encoders
+
+
+def compress_file(path: str) -> int:
+    # Write compressed siblings of path, returning how many were (re)written.
+    # Each sibling gets the source's mtime, which is how later runs (and the
+    # server) tell that it is up to date.
+    source_stat = os.stat(path)
+    data = None
+    written = 0
+    for suffix, compress in _encoders():
+        dest_path = path + suffix
+        try:
+            if os.stat(dest_path).st_mtime_ns == source_stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        write_atomic(
+            dest_path,
+            [compress(data)],
+            "wb",
+            (source_stat.st_atime_ns, source_stat.st_mtime_ns),
+        )
+        written += 1
+    return written
+
+
+def compress_tree(root: str, min_bytes: int = COMPRESS_MIN_BYTES, jobs=None):
+    # Pre-compress every compressible file under root above min_bytes, in
+    # parallel (zlib releases the GIL), and drop variants whose source is gone
+    candidates = []
+    for directory, _, files in os.walk(root):
+        names = set(files)
+        for name in files:
+            path = os.path.join(directory, name)
+            base, suffix = os.path.splitext(name)
+            if suffix in (".gz", ".br"):
+                if base.endswith(COMPRESSIBLE_EXTENSIONS) and base not in names:
+                    os.remove(path)
+                continue
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            if os.path.getsize(path) >= min_bytes:
+                candidates.append(path)
+
+    with ThreadPoolExecutor(jobs) as executor:
+        written = list(executor.map(compress_file, candidates))
+    updated = sum(1 for count in written if count)
+    print(
+        f"Compressed {updated} file(s), {len(candidates) - updated} already up to date"
+    )
+    return updated
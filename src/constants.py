@@ -19,5 +19,37 @@ TAG_TYPE_DIV = "div"
 TAG_TYPE_BOLD = "b"
 TAG_TYPE_ITALIC = "i"
 
+# Blank lines between blocks; captured so code fences can be rejoined
+block_separator_pattern = re.compile(r"(\n[ \t]*\n)")
+
 # Pre-compile the regex pattern for headings for efficiency. Implemented in textnode.py
 heading_pattern = re.compile(r"#{1,6}\s")
+
+# Characters that can start an inline span: code, bold/italic, link and image
+inline_special_pattern = re.compile(r"[`*!\[]")
+
+# Pages larger than this are converted block by block while reading, so
+# peak memory is bounded by the largest block rather than the file size
+STREAM_THRESHOLD_BYTES = 16 * 1024 * 1024
+
+# Template placeholders look like {{ Name }}; names are matched case-insensitively
+template_placeholder_pattern = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Build outputs that get pre-compressed siblings (e.g. index.css.gz) so the
+# server never has to compress on the fly
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg")
+COMPRESS_MIN_BYTES = 1024
+
+# Rendered page bodies kept on disk between builds, see render_cache.py
+RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Distinct blocks whose rendered HTML is kept in memory per process, see
+# helpers.render_block
+BLOCK_MEMO_MAX_ENTRIES = 4096
+
+# Pipelined builds (see pipeline.py): threads reading and writing files, and
+# pages allowed to wait between two stages before the earlier stage blocks
+PIPELINE_IO_THREADS = 2
+PIPELINE_QUEUE_SIZE = 64
+# A stage at least this busy is reported as the one limiting the build
+PIPELINE_SATURATION = 0.8
@@ -1,20 +1,143 @@
 import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fingerprint import fingerprinted_name
+from manifest import hash_file
+from plan import ensure_plan
 
 
-def copy_static(source, destination):
-    # verify source exists
-    if not os.path.exists(source):
-        raise ValueError("Source path does not exist")
-    for item in os.listdir(source):
-        full_path = os.path.join(source, item)
-        if os.path.isfile(full_path):
-            # Copy file to destination, this is the base case
-            print(f"Copying static file {full_path} to {destination}")
-            shutil.copy(full_path, destination)
-        else:
-            # If item is a folder, create it at destination
-            new_destination_folder = os.path.join(destination, item)
-            os.mkdir(new_destination_folder)
-            # Make recursive call on folder item with dest folder you just created
-            copy_static(full_path, new_destination_folder)
+def copy_static(source, destination, manifest=None, plan=None):
+    # Copies the static files of plan one by one. Without a plan the source
+    # tree is planned (and its output directories created) here.
+    plan = ensure_plan(plan, None, source, destination)
+    for full_path, dest_full_path in plan.copies:
+        if manifest is not None:
+            # Skip files whose content is unchanged since the last build
+            digest = manifest.hash(full_path, plan.stats.get(full_path))
+            if not manifest.needs_build(full_path, digest, dest_full_path):
+                continue
+        print(f"Copying static file {full_path} to {os.path.dirname(dest_full_path)}")
+        shutil.copy(full_path, dest_full_path)
+        if manifest is not None:
+            manifest.record(full_path, digest, dest_full_path)
+
+
+def stat_digest(file_stat):
+    # Cheap change marker for static files: size and mtime, no hashing
+    return f"{file_stat.st_size}:{file_stat.st_mtime_ns}"
+
+
+def copy_static_file(source, destination, link=False):
+    # Copy preserving mtime so later syncs can tell the file is up to date.
+    # Returns True if the file was hardlinked rather than copied.
+    if os.path.lexists(destination):
+        # Never write through an existing file: it may be a hardlink to source
+        os.remove(destination)
+    if link:
+        try:
+            os.link(source, destination)
+            return True
+        except OSError:
+            pass  # Different filesystem or no hardlink support
+    try:
+        # copy_file_range lets the kernel copy (or reflink, on CoW filesystems)
+        # without moving the data through userspace
+        with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except (AttributeError, OSError):
+        shutil.copyfile(source, destination)
+    shutil.copystat(source, destination)
+    return False
+
+
+def _url_path(path, root):
+    return "/" + os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def sync_static(
+    source,
+    destination,
+    manifest=None,
+    jobs=8,
+    link=False,
+    profiler=None,
+    assets=None,
+    plan=None,
+):
+    # Bring destination up to date with source: files whose size and mtime
+    # already match are skipped, the rest are copied on a thread pool, and
+    # outputs of static files that no longer exist are removed. The files
+    # come from plan, planned here if not given.
+    # When assets is a dict, every file also gets a name.<hash>.ext copy
+    # (a hardlink where possible) and assets maps each file's URL path to
+    # its fingerprinted one; the original names stay for references the
+    # build doesn't rewrite, such as url() in stylesheets.
+    start = time.perf_counter()
+    plan = ensure_plan(plan, None, source, destination)
+    to_copy = []
+    to_fingerprint = []
+    up_to_date = 0
+    for full_path, dest_full_path in plan.copies:
+        file_stat = plan.stat(full_path)
+        if manifest is not None:
+            manifest.record(full_path, stat_digest(file_stat), dest_full_path)
+        if assets is not None:
+            digest = (
+                manifest.hash(full_path, file_stat)
+                if manifest is not None
+                else hash_file(full_path)
+            )
+            name = os.path.basename(dest_full_path)
+            fingerprint_path = os.path.join(
+                os.path.dirname(dest_full_path), fingerprinted_name(name, digest)
+            )
+            url = _url_path(dest_full_path, destination)
+            assets[url] = _url_path(fingerprint_path, destination)
+            if not os.path.exists(fingerprint_path):
+                to_fingerprint.append((dest_full_path, fingerprint_path))
+        try:
+            dest_stat = os.stat(dest_full_path)
+            if (
+                dest_stat.st_size == file_stat.st_size
+                and dest_stat.st_mtime_ns == file_stat.st_mtime_ns
+            ):
+                up_to_date += 1
+                continue
+        except FileNotFoundError:
+            pass
+        to_copy.append((full_path, dest_full_path))
+
+    def copy(paths):
+        if profiler is None:
+            return copy_static_file(*paths, link=link)
+        done = profiler.timer("static_copy", paths[0])
+        linked = copy_static_file(*paths, link=link)
+        done(os.path.getsize(paths[1]))
+        return linked
+
+    linked = 0
+    if to_copy:
+        with ThreadPoolExecutor(jobs) as executor:
+            linked = sum(executor.map(copy, to_copy))
+    # Fingerprinted names never change content, so they can share the
+    # output's inode, unless the output is itself linked to the source: an
+    # in-place edit of the source would then change an immutable file
+    for dest_full_path, fingerprint_path in to_fingerprint:
+        copy_static_file(dest_full_path, fingerprint_path, link=not link)
+    removed = []
+    if manifest is not None:
+        removed = manifest.remove_stale(os.path.join(source, ""))
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Synced static files from {source}: {len(to_copy) - linked} copied, "
+        f"{linked} linked, {up_to_date} up to date, {len(removed)} removed "
+        f"in {elapsed:.2f}s"
+    )
+    return to_copy
@@ -0,0 +1,197 @@
+import json
+import os
+import socket
+import time
+from contextlib import redirect_stdout
+
+from watch import SourceTracker, apply_changes
+
+
+class _ClientLog:
+    # File-like stdout replacement that sends each printed line to the client.
+    # A client that hangs up mid-build doesn't interrupt the build.
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ""
+
+    def write(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            self._send(line)
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self._send(self.buffer)
+            self.buffer = ""
+
+    def _send(self, line):
+        if self.stream is None:
+            return
+        try:
+            _send(self.stream, {"log": line})
+        except OSError:
+            self.stream = None
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+class BuildDaemon:
+    # Keeps the imports, compiled template, block memo, manifest, site index
+    # and a snapshot of the source tree in memory between builds, and rebuilds
+    # whatever changed when a client asks over a Unix socket. Change detection
+    # only rescans directories inotify reported since the last build (the
+    # whole snapshot without inotify), so a warm single-page rebuild costs one
+    # page render instead of an interpreter start and a walk of the tree.
+    # Requests are handled one at a time, so builds never overlap.
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        public_dir,
+        manifest,
+        cache=None,
+        site_index=None,
+        site_url=None,
+        site_title=None,
+        site_author=None,
+    ):
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.template_path = template_path
+        self.public_dir = public_dir
+        self.manifest = manifest
+        self.cache = cache
+        self.site_index = site_index
+        self.site_url = site_url
+        self.site_title = site_title
+        self.site_author = site_author
+        self.tracker = SourceTracker(self.content_dir, self.static_dir, template_path)
+        self.builds = 0
+        self.running = False
+        self.server = None
+        self.socket_path = None
+
+    def build(self):
+        # Rebuild the outputs of sources changed since the last build and
+        # return their paths. Editors have finished saving by the time a
+        # client asks, so pending events are read without debouncing.
+        changes = self.tracker.changes(timeout=0, debounce=0)
+        self.builds += 1
+        if changes is None:
+            return []
+        changed, removed, template_changed = changes
+        outputs = apply_changes(
+            changed,
+            removed,
+            template_changed,
+            self.tracker.snapshot,
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            self.public_dir,
+            self.manifest,
+            self.cache,
+            self.site_index,
+            self.site_url,
+            self.site_title,
+            self.site_author,
+        )
+        return outputs
+
+    def listen(self, socket_path):
+        _remove_stale_socket(socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen()
+        self.socket_path = socket_path
+
+    def serve_forever(self):
+        # Handle requests until a client sends "stop" or Ctrl+C is pressed
+        print(
+            f"Build daemon listening on {self.socket_path} "
+            f"({self.tracker.watcher.name}), press Ctrl+C to stop"
+        )
+        self.running = True
+        try:
+            while self.running:
+                connection, _ = self.server.accept()
+                with connection:
+                    try:
+                        self._handle(connection)
+                    except OSError:
+                        pass  # The client hung up; a build still went through
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self.server.close()
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self.tracker.close()
+        if self.cache is not None:
+            self.cache.evict()
+
+    def _handle(self, connection):
+        with connection.makefile("rwb") as stream:
+            line = stream.readline()
+            if not line:
+                return  # Probed by _remove_stale_socket
+            try:
+                command = json.loads(line).get("command")
+            except (ValueError, AttributeError):
+                command = None
+            if command == "build":
+                reply = self._build_for_client(stream)
+            elif command == "status":
+                reply = {
+                    "pid": os.getpid(),
+                    "outputs": len(self.manifest.outputs),
+                    "builds": self.builds,
+                }
+            elif command == "stop":
+                self.running = False
+                reply = {"stopping": True}
+            else:
+                reply = {"error": f"Unknown command: {command!r}"}
+            _send(stream, reply)
+
+    def _build_for_client(self, stream):
+        start = time.perf_counter()
+        log = _ClientLog(stream)
+        try:
+            with redirect_stdout(log):
+                outputs = self.build()
+        except Exception as e:
+            # Keep serving; the client reports the failure
+            print(f"Build failed: {type(e).__name__}: {e}")
+            return {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            log.flush()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Rebuilt {len(outputs)} output(s) in {elapsed_ms:.1f} ms")
+        return {"outputs": len(outputs), "elapsed_ms": elapsed_ms}
+
+
+def _remove_stale_socket(socket_path):
+    # A socket file left behind by a daemon that didn't shut down cleanly is
+    # removed; one a live daemon is listening on is not
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            return
+    raise RuntimeError(f"A build daemon is already listening on {socket_path}")
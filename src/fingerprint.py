@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from atomic import write_atomic
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+FINGERPRINT_LENGTH = 10
+
+# Attribute values that can reference a static file
+asset_attribute_pattern = re.compile(r'\b(href|src)="([^"]*)"')
+
+
+def fingerprinted_name(name, digest):
+    # index.css -> index.<first hex digits of the content hash>.css
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+class AssetMap:
+    # Maps the URL path of each static file ("/index.css") to its
+    # fingerprinted URL path ("/index.0123456789.css") and rewrites
+    # references to them in generated HTML. Plain data, so it can be sent
+    # to worker processes.
+    def __init__(self, public_dir, urls):
+        self.public_dir = public_dir
+        self.urls = urls
+        # Identifies the whole mapping, in template cache keys
+        self.key = self._digest(urls)
+        # Asset URLs each template references, by template path
+        self._template_urls = {}
+
+    def _digest(self, urls):
+        digest = hashlib.sha256()
+        for url in sorted(urls):
+            digest.update(f"{url} {self.urls[url]}\n".encode())
+        return digest.hexdigest()
+
+    def page_key(self, template_path, dest_path, targets):
+        # Identifies the fingerprinted URLs one page points at: those in its
+        # template and those its link/image targets resolve to. Part of the
+        # page's manifest digest, so changing an asset only rebuilds the
+        # pages that use it. With targets unknown (None), the whole mapping.
+        if targets is None:
+            return self.key
+        urls = set(self._template_asset_urls(template_path))
+        page_dir = self.page_dir(dest_path)
+        for target in targets:
+            url = _resolve(_split_target(target)[0], page_dir)
+            if url in self.urls:
+                urls.add(url)
+        return self._digest(urls)
+
+    def _template_asset_urls(self, template_path):
+        # A template edit changes every page's digest anyway, so the scan is
+        # kept for the life of the map
+        urls = self._template_urls.get(template_path)
+        if urls is None:
+            with open(template_path) as f:
+                source = f.read()
+            urls = [
+                url
+                for _, value in asset_attribute_pattern.findall(source)
+                if (url := _resolve(_split_target(value)[0], None)) in self.urls
+            ]
+            self._template_urls[template_path] = urls
+        return urls
+
+    def page_dir(self, dest_path):
+        # URL directory of an output file, for resolving relative references
+        directory = os.path.relpath(os.path.dirname(dest_path), self.public_dir)
+        if directory == ".":
+            return "/"
+        return "/" + directory.replace(os.sep, "/") + "/"
+
+    def rewrite_html(self, html, page_dir=None):
+        # Replace href/src values that point at static files with their
+        # fingerprinted URLs. Relative values are resolved against page_dir;
+        # without one (templates, shared by every page) only root-relative
+        # values are rewritten.
+        def replace(match):
+            path, suffix = _split_target(match.group(2))
+            fingerprinted = self.urls.get(_resolve(path, page_dir))
+            if fingerprinted is None:
+                return match.group(0)
+            return f'{match.group(1)}="{fingerprinted}{suffix}"'
+
+        return asset_attribute_pattern.sub(replace, html)
+
+    def references_assets(self, targets):
+        # Whether any of a page's link/image targets may be a static file;
+        # pages without one are written without scanning their HTML
+        for target in targets:
+            path = target.split("?", 1)[0].split("#", 1)[0]
+            if path.startswith("/"):
+                if path in self.urls:
+                    return True
+            elif path and ":" not in path:
+                return True  # Relative, depends on the page's directory
+        return False
+
+
+def _split_target(value):
+    # "a.css?v=1#top" -> ("a.css", "?v=1#top")
+    cut = len(value)
+    for separator in "?#":
+        index = value.find(separator)
+        if index != -1:
+            cut = min(cut, index)
+    return value[:cut], value[cut:]
+
+
+def _resolve(path, page_dir):
+    # The URL path a reference points at on this site, or None for external
+    # URLs and, without a page_dir, relative ones
+    if not path or ":" in path or path.startswith("//"):
+        return None
+    if not path.startswith("/"):
+        if page_dir is None:
+            return None
+        path = posixpath.normpath(posixpath.join(page_dir, path))
+    return path
+
+
+def write_asset_manifest(public_dir, urls, state_dir):
+    # Writes asset-manifest.json to state_dir and deletes fingerprinted copies
+    # in public_dir that the previous manifest listed but the new one doesn't.
+    # Returns an AssetMap.
+    path = os.path.join(state_dir, ASSET_MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    current = set(urls.values())
+    for fingerprinted in set(previous.values()) - current:
+        try:
+            os.remove(os.path.join(public_dir, fingerprinted.lstrip("/")))
+        except FileNotFoundError:
+            pass
+    write_atomic(path, [json.dumps(urls, indent=2, sort_keys=True)])
+    return AssetMap(public_dir, urls)
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+# Shared by the test modules; not a test module itself
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
+
+
+class SiteTestCase(unittest.TestCase):
+    # A site in a temporary directory, removed after each test: paths for
+    # content/, static/, public/ and the build state directory (subclasses
+    # create what they need) and a template.html rendering the title and
+    # content
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # Runs after tearDown, so subclasses can still use the files there
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.state = os.path.join(root, "state")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, TEMPLATE)
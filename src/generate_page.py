@@ -1,46 +1,484 @@
-import re
-from helpers import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor
+from constants import STREAM_THRESHOLD_BYTES, TAG_TYPE_DIV
+from helpers import (
+    block_memo_stats,
+    block_metadata,
+    block_title,
+    block_to_html_node,
+    iter_markdown_blocks,
+    markdown_to_blocks,
+    page_metadata,
+    render_markdown,
+    render_markdown_stream,
+    split_front_matter,
+    split_front_matter_lines,
+)
+from htmlnode import ParentNode
+from plan import ensure_plan
+from profiler import BuildProfiler
+from template import load_template
 import os
 
 
-def extract_title(markdown: str) -> str:
-    return re.findall(r"#{1}\s(.*)\n", markdown)
+def generate_page(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    profiler=None,
+    cache=None,
+    assets=None,
+    file_stat=None,
+) -> dict:
+    # Returns the page metadata: title, headings, links and word count
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    if profiler is None:
+        return write_page(
+            from_path, template_path, dest_path, cache, assets, file_stat
+        )
+    return write_page_profiled(
+        from_path, template_path, dest_path, profiler, cache, assets, file_stat
+    )
 
 
-def generate_page(from_path: str, template_path: str, dest_path: str) -> None:
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+def write_page(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    cache=None,
+    assets=None,
+    file_stat=None,
+) -> dict:
+    # file_stat is the markdown's, if the caller already has it
+    size = file_stat.st_size if file_stat is not None else os.path.getsize(from_path)
+    if size > STREAM_THRESHOLD_BYTES:
+        return write_page_streaming(from_path, template_path, dest_path, assets)
 
-    # Read markdown source and template files into variables
+    # Read markdown source; the compiled template is cached across the build
     with open(from_path) as f:
         markdown = f.read()
-    with open(template_path) as f:
-        template = f.read()
+    template = load_template(template_path, assets)
+    context, metadata = _page_context(from_path, markdown, dest_path, cache, assets)
+
+    # Stream the rendered page straight into the destination file
+    with open(dest_path, "w") as f:
+        template.render_into(f.write, context)
+    return metadata
+
+
+def render_page(
+    from_path: str,
+    markdown: str,
+    template_path: str,
+    dest_path: str,
+    cache=None,
+    assets=None,
+) -> tuple:
+    # write_page without the file I/O, for callers that read and write pages
+    # themselves. Returns (page HTML, metadata).
+    template = load_template(template_path, assets)
+    context, metadata = _page_context(from_path, markdown, dest_path, cache, assets)
+    return template.render(context), metadata
+
+
+def _page_context(from_path: str, markdown: str, dest_path: str, cache, assets):
+    # Convert MD to HTML and fill the template placeholders, which can be
+    # supplied by the page's front-matter. Returns (context, metadata).
+    front_matter, markdown = split_front_matter(markdown)
+    html, metadata = _render_body(markdown, cache)
+    context = dict(front_matter)
+    _set_title(context, metadata, from_path)
+    context["content"] = _fingerprint_assets(html, metadata, dest_path, assets)
+    return context, metadata
+
+
+def _set_title(context: dict, metadata: dict, from_path: str) -> None:
+    # Front-matter wins over the page's first h1; the index records whichever
+    # title the page ends up with, and the front-matter date for the feed
+    if "title" not in context:
+        if metadata["title"] is None:
+            raise IndexError("No title found in " + from_path)
+        context["title"] = metadata["title"]
+    metadata["title"] = context["title"]
+    metadata["date"] = context.get("date")
+
+
+def _fingerprint_assets(html: str, metadata: dict, dest_path: str, assets) -> str:
+    # Point references to static files at their fingerprinted copies; the
+    # metadata tells which pages have any, so the rest aren't scanned
+    if assets is None or not assets.references_assets(
+        metadata["links"] + metadata["images"]
+    ):
+        return html
+    return assets.rewrite_html(html, assets.page_dir(dest_path))
+
+
+def _render_body(markdown: str, cache):
+    # The page body HTML and metadata, from the render cache or the block memo
+    if cache is None:
+        return render_markdown(markdown)
+    key = cache.key(markdown)
+    cached = cache.get(key)
+    if cached is None:
+        cached = render_markdown(markdown)
+        cache.put(key, *cached)
+    return cached
 
-    # Convert MD to HTML and replace heading and content of template
-    html_node = markdown_to_html_node(markdown)
-    content = html_node.to_html()
-    title = extract_title(markdown)
-    template = template.replace("{{ Title }}", title[0])
-    template = template.replace("{{ Content }}", content)
 
-    # Write HTML to destination, checking if directories exists
+def write_page_profiled(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    profiler,
+    cache=None,
+    assets=None,
+    file_stat=None,
+) -> dict:
+    # write_page with every stage timed separately. The page goes through
+    # intermediate strings so render, template fill and write can be told apart,
+    # and the block memo is bypassed so the parse stages show their real cost.
+    # Pages over the streaming threshold are still streamed, timed as a
+    # single "stream" stage, rather than loaded into memory.
+    size = file_stat.st_size if file_stat is not None else os.path.getsize(from_path)
+    if size > STREAM_THRESHOLD_BYTES:
+        done = profiler.timer("stream", from_path)
+        metadata = write_page_streaming(from_path, template_path, dest_path, assets)
+        done(size)
+        return metadata
+
+    done = profiler.timer("read", from_path)
+    with open(from_path) as f:
+        markdown = f.read()
+    done(len(markdown))
+    template = load_template(template_path, assets)
+    front_matter, markdown = split_front_matter(markdown)
+
+    cached = None
+    if cache is not None:
+        done = profiler.timer("cache_read", from_path)
+        key = cache.key(markdown)
+        cached = cache.get(key)
+        done(len(cached[0]) if cached is not None else 0)
+
+    if cached is not None:
+        html, metadata = cached
+    else:
+        done = profiler.timer("block_split", from_path)
+        blocks = markdown_to_blocks(markdown)
+        done(len(markdown))
+
+        # Block classification is included, but inline tokenizing dominates
+        done = profiler.timer("inline_parse", from_path)
+        nodes = [block_to_html_node(block) for block in blocks]
+        done(len(markdown))
+
+        done = profiler.timer("render", from_path)
+        html = ParentNode(TAG_TYPE_DIV, nodes).to_html()
+        done(len(html))
+        metadata = page_metadata(map(block_metadata, blocks, nodes))
+        if cache is not None:
+            cache.put(key, html, metadata)
+
+    context = dict(front_matter)
+    _set_title(context, metadata, from_path)
+
+    done = profiler.timer("template", from_path)
+    context["content"] = _fingerprint_assets(html, metadata, dest_path, assets)
+    page = template.render(context)
+    done(len(page))
+
+    done = profiler.timer("write", from_path)
     with open(dest_path, "w") as f:
-        f.write(template)
-
-def generate_pages_recursive(dir_path_content: str, template_path: str, dest_dir_path: str) -> None:
-    # verify source dir exists
-    if not os.path.exists(dir_path_content):
-        raise ValueError("Source directory does not exist")
-    for item in os.listdir(dir_path_content):
-        full_path = os.path.join(dir_path_content, item)
-        if os.path.isfile(full_path):
-            # Generate page from source dir to destination, this is the base case
-            dest_item = item[:-2] + "html" # Change file extension
-            dest_full_path = os.path.join(dest_dir_path, dest_item)
-            generate_page(full_path, template_path, dest_full_path)
+        f.write(page)
+    done(len(page))
+    return metadata
+
+
+class _MarkdownStream:
+    # Template value that converts and writes the markdown one block at a time
+    def __init__(self, lines):
+        self.lines = lines
+        self.metadata = None
+
+    def render_into(self, write):
+        self.metadata = render_markdown_stream(self.lines, write)
+
+
+def write_page_streaming(
+    from_path: str, template_path: str, dest_path: str, assets=None
+) -> dict:
+    # Same output as write_page, but the source is never held in memory as a
+    # whole: blocks are converted and written as soon as they are read
+    template = load_template(template_path, assets)
+    with open(from_path) as f:
+        front_matter, lines = split_front_matter_lines(f)
+        context = dict(front_matter)
+        if "title" not in context:
+            # The title comes before the content in the template, so find it
+            # with a separate line scan of the file
+            context["title"] = _scan_title(from_path)
+        stream = _MarkdownStream(lines)
+        context["content"] = stream
+        with open(dest_path, "w") as out:
+            write = out.write
+            if assets is not None:
+                # Leaf elements arrive whole, one write each, so every
+                # attribute can be rewritten within its chunk
+                page_dir = assets.page_dir(dest_path)
+
+                def write(chunk):
+                    out.write(assets.rewrite_html(chunk, page_dir))
+
+            template.render_into(write, context)
+    metadata = stream.metadata
+    _set_title(context, metadata, from_path)
+    return metadata
+
+
+def _scan_title(from_path: str) -> str:
+    # The first h1 block's title, split into blocks as the render will be
+    with open(from_path) as f:
+        _, lines = split_front_matter_lines(f)
+        for block in iter_markdown_blocks(lines):
+            title = block_title(block)
+            if title is not None:
+                return title
+    raise IndexError("No title found in " + from_path)
+
+
+def page_digest(
+    manifest,
+    from_path: str,
+    template_path: str,
+    assets=None,
+    file_stat=None,
+    template_stat=None,
+    dest_path=None,
+    targets=None,
+) -> str:
+    # A page depends on its markdown, the template and, when fingerprinting,
+    # the fingerprinted URLs of the assets it references. file_stat and
+    # template_stat are those files' stats, if known; executors stat the
+    # template once per build. targets are the page's link and image targets
+    # (see indexed_targets); without them every asset counts.
+    source_hash = manifest.hash(from_path, file_stat)
+    digest = f"{source_hash}:{manifest.hash(template_path, template_stat)}"
+    if assets is not None:
+        digest += ":" + assets.page_key(template_path, dest_path, targets)
+    return digest
+
+
+def indexed_targets(site_index, from_path: str):
+    # Link and image targets of a page as of its last build, or None. They
+    # can stand in for the page's current ones when checking whether it is
+    # stale: if its source changed, its digest has changed anyway.
+    page = site_index.pages.get(from_path) if site_index is not None else None
+    if page is None:
+        return None
+    return page["links"] + page["images"]
+
+
+def recorded_digest(
+    digest: str, site_index, assets, template_path: str, dest_path: str, metadata
+) -> str:
+    # The digest to record for a page just built from the stale check's
+    # digest: its asset part is recomputed from the targets the page has now,
+    # which the next build reads back from the site index
+    if assets is None or site_index is None:
+        return digest
+    targets = metadata["links"] + metadata["images"]
+    base = digest.rpartition(":")[0]
+    return f"{base}:{assets.page_key(template_path, dest_path, targets)}"
+
+
+def generate_pages_recursive(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    manifest=None,
+    profiler=None,
+    cache=None,
+    site_index=None,
+    assets=None,
+    plan=None,
+) -> None:
+    # Builds the pages of plan, one after another. Without a plan the
+    # content tree is planned (and its output directories created) here.
+    plan = ensure_plan(plan, dir_path_content, None, dest_dir_path)
+    template_stat = os.stat(template_path) if manifest is not None else None
+    for full_path, dest_full_path in plan.pages:
+        file_stat = plan.stats.get(full_path)
+        if manifest is not None:
+            digest = page_digest(
+                manifest,
+                full_path,
+                template_path,
+                assets,
+                file_stat,
+                template_stat,
+                dest_full_path,
+                indexed_targets(site_index, full_path),
+            )
+            if not manifest.needs_build(full_path, digest, dest_full_path):
+                continue
+        metadata = generate_page(
+            full_path,
+            template_path,
+            dest_full_path,
+            profiler,
+            cache,
+            assets,
+            file_stat,
+        )
+        if manifest is not None:
+            digest = recorded_digest(
+                digest, site_index, assets, template_path, dest_full_path, metadata
+            )
+            manifest.record(full_path, digest, dest_full_path)
+        if site_index is not None:
+            site_index.update(
+                full_path,
+                dest_full_path,
+                _source_hash(manifest, full_path, file_stat),
+                metadata,
+            )
+
+
+def _source_hash(manifest, from_path: str, file_stat=None):
+    # The manifest has hashed every page it checked, so this is a lookup
+    return manifest.hash(from_path, file_stat) if manifest is not None else None
+
+
+def collect_pages(dir_path_content: str, dest_dir_path: str) -> list:
+    # Plan the content tree, creating every output directory up front, and
+    # return (source, destination) pairs in a stable order
+    return ensure_plan(None, dir_path_content, None, dest_dir_path).pages
+
+
+def stale_pages(
+    manifest, plan, template_path: str, assets=None, site_index=None
+) -> tuple:
+    # The (source, destination) pairs of plan that need building, and the
+    # manifest digest of each one's source. Without a manifest every page is
+    # stale.
+    digests = {}
+    if manifest is None:
+        return plan.pages, digests
+    stale = []
+    template_stat = os.stat(template_path)
+    for from_path, dest_path in plan.pages:
+        file_stat = plan.stats.get(from_path)
+        digest = page_digest(
+            manifest,
+            from_path,
+            template_path,
+            assets,
+            file_stat,
+            template_stat,
+            dest_path,
+            indexed_targets(site_index, from_path),
+        )
+        if manifest.needs_build(from_path, digest, dest_path):
+            digests[from_path] = digest
+            stale.append((from_path, dest_path))
+    return stale, digests
+
+
+def _write_page_job(job: tuple):
+    # Runs in a worker process; errors are returned rather than raised so
+    # one bad page doesn't hide the results of the rest of its batch.
+    # Returns (error, page metadata, profiler events, (block memo hits, misses)).
+    from_path, template_path, dest_path, profile, cache, assets, file_stat = job
+    profiler = BuildProfiler() if profile else None
+    hits, misses = block_memo_stats()
+    try:
+        if profiler is None:
+            metadata = write_page(
+                from_path, template_path, dest_path, cache, assets, file_stat
+            )
         else:
-            # If item is a folder, create it at destination
-            new_destination_folder = os.path.join(dest_dir_path, item)
-            os.mkdir(new_destination_folder)
-            # Make recursive call on folder item with dest folder you just created
-            generate_pages_recursive(full_path, template_path, new_destination_folder)
\ No newline at end of file
+            metadata = write_page_profiled(
+                from_path,
+                template_path,
+                dest_path,
+                profiler,
+                cache,
+                assets,
+                file_stat,
+            )
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None, [], (0, 0)
+    events = profiler.events if profiler is not None else []
+    after_hits, after_misses = block_memo_stats()
+    return None, metadata, events, (after_hits - hits, after_misses - misses)
+
+
+def generate_pages_parallel(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    jobs: int,
+    manifest=None,
+    profiler=None,
+    cache=None,
+    site_index=None,
+    assets=None,
+    plan=None,
+) -> tuple:
+    # Builds the pages of plan (planned here if not given) on worker
+    # processes. Returns the (hits, misses) of the workers' block memos.
+    plan = ensure_plan(plan, dir_path_content, None, dest_dir_path)
+    pages, digests = stale_pages(manifest, plan, template_path, assets, site_index)
+    if not pages:
+        return 0, 0
+
+    profile = profiler is not None
+    work = [
+        (
+            from_path,
+            template_path,
+            dest_path,
+            profile,
+            cache,
+            assets,
+            plan.stats.get(from_path),
+        )
+        for from_path, dest_path in pages
+    ]
+    # Send pages to workers in batches to amortise inter-process overhead
+    chunksize = max(1, len(work) // (jobs * 4))
+    failures = []
+    memo_hits = memo_misses = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map() yields results in submission order, so the log is deterministic
+        results = executor.map(_write_page_job, work, chunksize=chunksize)
+        for (from_path, _, dest_path, *_), result in zip(work, results):
+            error, metadata, events, (hits, misses) = result
+            memo_hits += hits
+            memo_misses += misses
+            if profile:
+                profiler.extend(events)
+            print(
+                f"Generating page from {from_path} to {dest_path} using {template_path}"
+            )
+            if error is not None:
+                print(f"Error generating page {from_path}: {error}")
+                failures.append(from_path)
+                continue
+            if manifest is not None:
+                digest = recorded_digest(
+                    digests[from_path],
+                    site_index,
+                    assets,
+                    template_path,
+                    dest_path,
+                    metadata,
+                )
+                manifest.record(from_path, digest, dest_path)
+            if site_index is not None:
+                source_hash = _source_hash(
+                    manifest, from_path, plan.stats.get(from_path)
+                )
+                site_index.update(from_path, dest_path, source_hash, metadata)
+    if failures:
+        raise RuntimeError(f"{len(failures)} page(s) failed to generate")
+    return memo_hits, memo_misses
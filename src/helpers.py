@@ -1,7 +1,12 @@
+import functools
+import itertools
 import re
 
 from constants import (
+    BLOCK_MEMO_MAX_ENTRIES,
+    block_separator_pattern,
     heading_pattern,
+    inline_special_pattern,
     BLOCK_TYPE_CODE,
     BLOCK_TYPE_HEADING,
     BLOCK_TYPE_ORDERED_LIST,
@@ -25,37 +30,133 @@ from htmlnode import ParentNode
 
 
 # Text processing functions
+def split_front_matter(markdown):
+    # Pages may start with a "---" fenced block of "key: value" lines; keys
+    # are lowercased so they can be matched against template placeholders
+    if not markdown.startswith("---\n"):
+        return {}, markdown
+    end = markdown.find("\n---", 3)
+    if end == -1:
+        return {}, markdown
+    front_matter = {}
+    for line in markdown[4:end].split("\n"):
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            front_matter[key.strip().lower()] = value.strip()
+    body_start = markdown.find("\n", end + 4)
+    body = "" if body_start == -1 else markdown[body_start + 1 :]
+    return front_matter, body
+
+
+def split_front_matter_lines(lines):
+    # Line-based split_front_matter for streamed sources: returns the
+    # front-matter and an iterator over the remaining lines
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, iter(())
+    if first.rstrip("\n") != "---":
+        return {}, itertools.chain([first], lines)
+    consumed = [first]
+    front_matter = {}
+    for line in lines:
+        consumed.append(line)
+        if line.rstrip("\n") == "---":
+            return front_matter, lines
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            front_matter[key.strip().lower()] = value.strip()
+    # Unterminated, so it wasn't front-matter after all
+    return {}, iter(consumed)
+
+
+def iter_markdown_blocks(lines):
+    # Streaming counterpart of markdown_to_blocks: yields each block as soon
+    # as a blank line ends it. Blank lines inside ``` fences don't end a block.
+    block = []
+    in_code = False
+    for line in lines:
+        line = line.rstrip("\n")
+        # Blank as markdown_to_blocks' separator pattern defines it
+        if not in_code and not line.strip(" \t"):
+            if block:
+                yield "\n".join(block).strip()
+                block = []
+            continue
+        block.append(line)
+        if line.count("```") % 2 == 1:
+            in_code = not in_code
+    if block:
+        yield "\n".join(block).strip()
+
+
 def markdown_to_blocks(markdown):
-    blocks = re.split(r"\n[ \t]*\n", markdown)
-    for idx, block in enumerate(blocks):
-        blocks[idx] = block.strip()
+    # Same blocks as iter_markdown_blocks: blank lines end a block unless an
+    # unclosed ``` fence is open, and empty blocks are dropped. Splitting with
+    # the regex and rejoining the pieces of a fence keeps the common case fast.
+    pieces = block_separator_pattern.split(markdown)
+    if "```" not in markdown:
+        return [block for block in map(str.strip, pieces[::2]) if block]
+    blocks = []
+    block = pieces[0]
+    in_code = block.count("```") % 2 == 1
+    for index in range(1, len(pieces), 2):
+        separator, piece = pieces[index], pieces[index + 1]
+        if in_code:
+            block += separator + piece
+        else:
+            block = block.strip()
+            if block:
+                blocks.append(block)
+            block = piece
+        if piece.count("```") % 2 == 1:
+            in_code = not in_code
+    block = block.strip()
+    if block:
+        blocks.append(block)
     return blocks
 
 
-def block_to_block_type(block):
-    if heading_pattern.search(block):
-        return BLOCK_TYPE_HEADING
-    elif block.startswith("```") and block.endswith("```"):
-        return BLOCK_TYPE_CODE
-    elif block.startswith("> "):
-        for line in block.split("\n"):
+def classify_block(block):
+    # Decides the block type in one scan of its lines, dispatching on the
+    # first character, and returns (block type, lines) where lines are the
+    # item texts with their markers stripped, ready for the block's builder.
+    # Only the start of the block can make it a heading. Headings and code
+    # blocks have no line list; their builders slice the block directly.
+    first = block[:1]
+    if first == "#" and heading_pattern.match(block):
+        return BLOCK_TYPE_HEADING, None
+    if first == "`" and block.startswith("```") and block.endswith("```"):
+        return BLOCK_TYPE_CODE, None
+    lines = block.split("\n")
+    if first == ">" and block.startswith("> "):
+        items = []
+        for line in lines:
             if not line.startswith("> "):
-                return BLOCK_TYPE_PARAGRAPH
-        return BLOCK_TYPE_QUOTE
-    elif block.startswith("* ") or block.startswith("- "):
-        for line in block.split("\n"):
-            if not line.strip().startswith("* ") and not line.strip().startswith("- "):
-                return BLOCK_TYPE_PARAGRAPH
-        return BLOCK_TYPE_UNORDERED_LIST
-    elif block.startswith("1. "):
-        list_count = 1
-        for line in block.split("\n"):
-            if not line.startswith(f"{str(list_count)}. "):
-                return BLOCK_TYPE_PARAGRAPH
-            list_count += 1
-        return BLOCK_TYPE_ORDERED_LIST
-    else:
-        return BLOCK_TYPE_PARAGRAPH
+                return BLOCK_TYPE_PARAGRAPH, lines
+            items.append(line.lstrip(">").strip())
+        return BLOCK_TYPE_QUOTE, items
+    if (first == "*" or first == "-") and block[1:2] == " ":
+        items = []
+        for line in lines:
+            line = line.strip()
+            if not line.startswith("* ") and not line.startswith("- "):
+                return BLOCK_TYPE_PARAGRAPH, lines
+            items.append(line[2:])
+        return BLOCK_TYPE_UNORDERED_LIST, items
+    if first == "1" and block.startswith("1. "):
+        items = []
+        for number, line in enumerate(lines, 1):
+            marker = f"{number}. "
+            if not line.startswith(marker):
+                return BLOCK_TYPE_PARAGRAPH, lines
+            items.append(line[len(marker) :].strip())
+        return BLOCK_TYPE_ORDERED_LIST, items
+    return BLOCK_TYPE_PARAGRAPH, lines
+
+
+def block_to_block_type(block):
+    return classify_block(block)[0]
 
 
 # Inline TextNode/HTMLNode processing functions
@@ -153,6 +254,96 @@ def text_to_textnodes(text):
     return extracted_nodes
 
 
+def tokenize_inline(text):
+    # Single left-to-right scan producing the same TextNode stream as
+    # text_to_textnodes, which is kept as the reference implementation.
+    # The cascade rescans and re-splits the text once per span type (and once
+    # per image/link), this scan touches each character a constant number of
+    # times. Spans are recognised in the order they appear, so markup nested
+    # inside another span stays literal, and every delimited pair is styled
+    # rather than only the first pair of each node.
+    nodes = []
+    searches = {}
+    run_start = 0
+    position = 0
+
+    def find(token, start):
+        # Memoised str.find: searches only move forward, so a previous result
+        # past start is still the first occurrence and need not be repeated
+        cached = searches.get(token)
+        if cached is not None and cached[0] <= start and (
+            cached[1] == -1 or cached[1] >= start
+        ):
+            return cached[1]
+        index = text.find(token, start)
+        searches[token] = (start, index)
+        return index
+
+    def flush(end):
+        # Emit the plain text accumulated since the last span, if any
+        if end > run_start:
+            nodes.append(TextNode(text[run_start:end], TextNode.text_type_text))
+            return True
+        return False
+
+    while True:
+        match = inline_special_pattern.search(text, position)
+        if match is None:
+            break
+        start = match.start()
+        char = text[start]
+        if char == "`" or char == "*":
+            if char == "`":
+                delimiter, text_type = "`", TextNode.text_type_code
+            elif text.startswith("**", start):
+                delimiter, text_type = "**", TextNode.text_type_bold
+            else:
+                delimiter, text_type = "*", TextNode.text_type_italic
+            end = find(delimiter, start + len(delimiter))
+            if end == -1:
+                raise Exception("Input nodes have bad Markdown syntax")
+            flush(start)
+            # Empty spans are dropped, as the reference does
+            if end > start + len(delimiter):
+                nodes.append(TextNode(text[start + len(delimiter) : end], text_type))
+            position = run_start = end + len(delimiter)
+            continue
+
+        is_image = char == "!"
+        position = start + 1
+        if is_image and not text.startswith("![", start):
+            continue
+        label_start = start + 2 if is_image else start + 1
+        label_end = find("](", label_start)
+        if label_end == -1:
+            continue
+        url_end = find(")", label_end + 2)
+        if url_end == -1 or text.find("\n", start, url_end) != -1:
+            continue
+        if not is_image:
+            # Images are extracted before links in the reference, so an image
+            # opening inside the link label claims the closing "](" instead
+            image_start = find("![", label_start)
+            if image_start != -1 and image_start < label_end:
+                continue
+        label = text[label_start:label_end]
+        url = text[label_end + 2 : url_end]
+        if is_image:
+            flush(start)
+            if label:
+                nodes.append(TextNode(label, TextNode.text_type_image, url))
+        else:
+            # The reference emits an empty text node ahead of a link that
+            # isn't preceded by text; keep that so the streams compare equal
+            if not flush(start):
+                nodes.append(TextNode("", TextNode.text_type_text))
+            nodes.append(TextNode(label, TextNode.text_type_link, url))
+        position = run_start = url_end + 1
+
+    flush(len(text))
+    return nodes
+
+
 def extract_markdown_images(text):
     matches = re.findall(r"!\[(.*?)\]\((.*?)\)", text)
     return matches
@@ -164,7 +355,7 @@ def extract_markdown_links(text):
 
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
+    text_nodes = tokenize_inline(text)
     children = []
     for text_node in text_nodes:
         html_node = text_node.text_node_to_html_node()
@@ -173,44 +364,33 @@ def text_to_children(text):
 
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
-    # Create ParentNode based on block type
-    if block_type == BLOCK_TYPE_QUOTE:
-        return blockquote_to_html_node(block)
-    elif block_type == BLOCK_TYPE_PARAGRAPH:
-        return paragraph_to_html_node(block)
-    elif block_type == BLOCK_TYPE_HEADING:
-        return heading_to_html_node(block)
-    elif block_type == BLOCK_TYPE_CODE:
-        return code_to_html_node(block)
-    elif block_type == BLOCK_TYPE_UNORDERED_LIST:
-        return unordered_list_to_html_node(block)
-    elif block_type == BLOCK_TYPE_ORDERED_LIST:
-        return ordered_list_to_html_node(block)
-    raise ValueError("Invalid block type")
-
-
-# HTML tag wrapping functions for inline children
-def blockquote_to_html_node(block):
-    lines = block.split("\n")
-    new_lines = []
-    for line in lines:
-        if not line.startswith(">"):
-            raise ValueError("Invalid quote block")
-        new_lines.append(line.lstrip(">").strip())
-    content = " ".join(new_lines)
+    block_type, lines = classify_block(block)
+    return BLOCK_BUILDERS[block_type](block, lines)
+
+
+# HTML tag wrapping functions for inline children. Each takes the block and
+# optionally the stripped lines classify_block collected for it.
+def blockquote_to_html_node(block, lines=None):
+    if lines is None:
+        lines = []
+        for line in block.split("\n"):
+            if not line.startswith(">"):
+                raise ValueError("Invalid quote block")
+            lines.append(line.lstrip(">").strip())
+    content = " ".join(lines)
     inline_children = text_to_children(content)
     return ParentNode(TAG_TYPE_QUOTE, inline_children)
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def paragraph_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     paragraph = " ".join(lines)
     inline_children = text_to_children(paragraph)
     return ParentNode(TAG_TYPE_PARAGRAPH, inline_children)
 
 
-def code_to_html_node(block):
+def code_to_html_node(block, lines=None):
     if not block.startswith("```") or not block.endswith("```"):
         raise ValueError("Invalid code block")
     text = block[3:-3]
@@ -219,7 +399,7 @@ def code_to_html_node(block):
     return ParentNode(TAG_TYPE_PREFORMATTED_TEXT, [code])
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(block, lines=None):
     heading_level = 0
     for char in block:
         if char == "#":
@@ -233,27 +413,37 @@ def heading_to_html_node(block):
     return ParentNode(TAG_TYPE_HEADING + str(heading_level), inline_children)
 
 
-def unordered_list_to_html_node(text):
-    child_list_items = []
-    for list_item in text.split("\n"):
+def unordered_list_to_html_node(text, lines=None):
+    if lines is None:
         # Remove any extra whitespace, bullet and space at list item start
-        list_item = list_item.strip()
-        list_item = list_item[2:]
+        lines = [list_item.strip()[2:] for list_item in text.split("\n")]
+    child_list_items = []
+    for list_item in lines:
         inline_children = text_to_children(list_item)
         child_list_items.append(ParentNode(TAG_TYPE_LIST_ITEM, inline_children))
     return ParentNode(TAG_TYPE_UNORDERED_LIST, child_list_items)
 
-def ordered_list_to_html_node(text):
-    child_list_items = []
-    for list_item in text.split("\n"):
+def ordered_list_to_html_node(text, lines=None):
+    if lines is None:
         # Remove any extra whitespace, number, period and space at list item start
-        list_item = list_item.strip()
-        list_item = list_item[3:]
+        lines = [list_item.strip()[3:] for list_item in text.split("\n")]
+    child_list_items = []
+    for list_item in lines:
         inline_children = text_to_children(list_item)
         child_list_items.append(ParentNode(TAG_TYPE_LIST_ITEM, inline_children))
     return ParentNode(TAG_TYPE_ORDERED_LIST, child_list_items)
 
 
+BLOCK_BUILDERS = {
+    BLOCK_TYPE_QUOTE: blockquote_to_html_node,
+    BLOCK_TYPE_PARAGRAPH: paragraph_to_html_node,
+    BLOCK_TYPE_HEADING: heading_to_html_node,
+    BLOCK_TYPE_CODE: code_to_html_node,
+    BLOCK_TYPE_UNORDERED_LIST: unordered_list_to_html_node,
+    BLOCK_TYPE_ORDERED_LIST: ordered_list_to_html_node,
+}
+
+
 # Convert full markdown text string to properly nested HTML nodes
 def markdown_to_html_node(markdown):
     # Break markdown into blocks
@@ -265,3 +455,107 @@ def markdown_to_html_node(markdown):
         child_nodes.append(block_to_html_node(block))
 
     return ParentNode(TAG_TYPE_DIV, child_nodes)
+
+
+# Title source line, headings, outbound links, image sources and word count
+# of one block, read off its node tree so the source text isn't scanned again
+def block_metadata(block, node):
+    links = []
+    images = []
+    texts = []
+    words = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.children is not None:
+            stack.extend(reversed(current.children))
+            continue
+        if current.tag == "a":
+            links.append(current.props["href"])
+        elif current.tag == "img":
+            images.append(current.props["src"])
+        if current.value:
+            texts.append(current.value)
+            words += len(current.value.split())
+    title = None
+    headings = ()
+    tag = node.tag
+    if tag[:1] == TAG_TYPE_HEADING and tag[1:].isdigit():
+        level = int(tag[1:])
+        headings = ((level, " ".join("".join(texts).split())),)
+        if level == 1:
+            title = block_title(block)
+    return title, headings, tuple(links), tuple(images), words
+
+
+def block_title(block):
+    # The page title an h1 block gives, or None for any other block. Raw
+    # first line, the way the page title has always been taken.
+    if block[:1] == "#" and block[1:2].isspace():
+        return block[2:].split("\n", 1)[0]
+    return None
+
+
+def page_metadata(blocks_metadata):
+    # Combine block_metadata results into the metadata of a whole page
+    title = None
+    headings = []
+    links = []
+    images = []
+    words = 0
+    for metadata in blocks_metadata:
+        block_title, block_headings, block_links, block_images, block_words = metadata
+        if title is None:
+            title = block_title
+        headings.extend(block_headings)
+        links.extend(block_links)
+        images.extend(block_images)
+        words += block_words
+    return {
+        "title": title,
+        "headings": headings,
+        "links": links,
+        "images": images,
+        "words": words,
+    }
+
+
+# Rendered HTML and metadata of one block. Pages repeat blocks verbatim
+# (disclaimers, snippets, boilerplate lists), so results are memoised by the
+# raw block text; every worker process of a pooled build keeps its own memo.
+@functools.lru_cache(maxsize=BLOCK_MEMO_MAX_ENTRIES)
+def render_block(block):
+    node = block_to_html_node(block)
+    return node.to_html(), block_metadata(block, node)
+
+
+def block_memo_stats():
+    # (hits, misses) of render_block since the process started
+    info = render_block.cache_info()
+    return info.hits, info.misses
+
+
+# Same HTML as markdown_to_html_node(markdown).to_html(), from memoised blocks,
+# along with the page metadata
+def render_markdown(markdown):
+    fragments = []
+    blocks_metadata = []
+    for block in markdown_to_blocks(markdown):
+        html, metadata = render_block(block)
+        fragments.append(html)
+        blocks_metadata.append(metadata)
+    html = f"<{TAG_TYPE_DIV}>{''.join(fragments)}</{TAG_TYPE_DIV}>"
+    return html, page_metadata(blocks_metadata)
+
+
+# Convert a stream of markdown lines to HTML, writing each block as it ends.
+# Returns the page metadata.
+def render_markdown_stream(lines, write):
+    blocks_metadata = []
+    write(f"<{TAG_TYPE_DIV}>")
+    for block in iter_markdown_blocks(lines):
+        node = block_to_html_node(block)
+        blocks_metadata.append(block_metadata(block, node))
+        node.render_into(write)
+    write(f"</{TAG_TYPE_DIV}>")
+    return page_metadata(blocks_metadata)
@@ -1,4 +1,7 @@
 class HTMLNode:
+    # __slots__ drops the per-instance __dict__; documents have many nodes
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -8,6 +11,10 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError
 
+    def render_into(self, write):
+        # Stream the HTML to write() in chunks instead of building one string
+        raise NotImplementedError
+
     def props_to_html(self):
         props = []
         if self.props is not None:
@@ -32,6 +39,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, props=props)
 
@@ -42,17 +51,29 @@ class LeafNode(HTMLNode):
             return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
         return f"{self.value}"
 
+    def render_into(self, write):
+        write(self.to_html())
+
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
     def to_html(self):
+        # Collect chunks and join once; repeated += copies the output so far
+        # at every level of the tree
+        chunks = []
+        self.render_into(chunks.append)
+        return "".join(chunks)
+
+    def render_into(self, write):
         if self.tag is None:
             raise ValueError("Parentnode requires a tag")
         if self.children is None:
             raise ValueError("Parentnode requires children")
-        output = f"<{self.tag}{self.props_to_html()}>"
+        write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            output += child.to_html()
-        return f"{output}</{self.tag}>"
+            child.render_into(write)
+        write(f"</{self.tag}>")
@@ -1,21 +1,433 @@
+import argparse
 import shutil
 import os
-from copy_static import copy_static
-from generate_page import generate_pages_recursive
+import sys
+from build_client import SOCKET_PATH
+from check_links import check_links
+from compress import compress_tree
+from constants import PIPELINE_IO_THREADS, RENDER_CACHE_MAX_BYTES
+from copy_static import sync_static
+from daemon import BuildDaemon
+from fingerprint import write_asset_manifest
+from generate_page import generate_pages_parallel, generate_pages_recursive
+from helpers import block_memo_stats
+from manifest import Manifest, MANIFEST_NAME
+from pipeline import generate_pages_pipelined
+from plan import plan_build
+from profiler import BuildProfiler
+from render_cache import RenderCache
+from shards import merge_shards, parse_shard, shard_dir, shard_plan
+from site_index import SiteIndex, SITE_INDEX_NAME
+from sitemap import write_feed, write_sitemap
+from watch import live_reload_notifier, watch
 
-def main(): 
-    # Copy static files to public folder
-    source = "/Users/derek/code/staticsitegen/static"
-    destination = "/Users/derek/code/staticsitegen/public"
-    shutil.rmtree(destination, ignore_errors=True)
-    os.mkdir(destination)
-    copy_static(source, destination)
+STATIC_DIR = "/Users/derek/code/staticsitegen/static"
+CONTENT_DIR = "/Users/derek/code/staticsitegen/content/"
+TEMPLATE_PATH = "/Users/derek/code/staticsitegen/template.html"
+PUBLIC_DIR = "/Users/derek/code/staticsitegen/public"
+CACHE_DIR = "/Users/derek/code/staticsitegen/.cache/render"
+# Manifest, site index, sitemap state and asset manifest, kept out of the
+# served tree since they list absolute source paths
+STATE_DIR = "/Users/derek/code/staticsitegen/.cache/state"
+SITE_URL = "http://localhost:8888"
+SITE_TITLE = "Tolkien Fan Club"
+SITE_AUTHOR = "Tolkien Fan Club"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rebuild outputs whose sources changed since the last build",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes used to generate pages",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap reading, rendering (on --jobs workers) and writing pages",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=PIPELINE_IO_THREADS,
+        metavar="N",
+        help="Threads reading and, separately, writing pages with --pipeline",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After building, rebuild affected outputs whenever a source changes",
+    )
+    parser.add_argument(
+        "--live-reload",
+        metavar="URL",
+        help="In watch mode, POST changed paths to this live reload endpoint, "
+        "e.g. http://localhost:8888/__livereload",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Write pre-compressed .gz siblings of HTML/CSS/JS/SVG outputs",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="Hardlink static files into public/ instead of copying them",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time each build stage per file and report the slowest pages",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of slowest pages to list with --profile",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a Chrome trace-event JSON of the build (implies --profile)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every page instead of reusing rendered bodies from the cache",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Empty the render cache before building",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=RENDER_CACHE_MAX_BYTES >> 20,
+        metavar="MIB",
+        help="Render cache size cap in MiB; least recently used entries go first",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="Report internal links and images that point at no built file",
+    )
+    parser.add_argument(
+        "--site-url",
+        default=SITE_URL,
+        help="Absolute URL the site is served from, used in sitemap.xml and feed.xml",
+    )
+    parser.add_argument(
+        "--site-title",
+        default=SITE_TITLE,
+        help="Title of the site's feed.xml",
+    )
+    parser.add_argument(
+        "--site-author",
+        default=SITE_AUTHOR,
+        help="Author named in the site's feed.xml",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Give static files content-hashed names and point pages at them",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the build plan (directories, pages, static copies, or with "
+        "--merge the files it would copy) and exit without touching the disk",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="Build only shard I of N of the pages (shard 1 also copies static "
+        "files) into public.shard-I-of-N/, e.g. on one of N machines",
+    )
+    parser.add_argument(
+        "--merge",
+        type=int,
+        metavar="N",
+        help="Merge the outputs of shards 1..N into public/, checking for "
+        "conflicts, then write the sitemap and feed (and with --compress, "
+        "compress the merged site)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="After building, keep running and rebuild changed outputs whenever "
+        "build_client.py asks",
+    )
+    parser.add_argument(
+        "--socket",
+        default=SOCKET_PATH,
+        help="Unix socket the --daemon listens on",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.io_threads < 1:
+        parser.error("--io-threads must be at least 1")
+    if args.live_reload and not args.watch:
+        parser.error("--live-reload requires --watch")
+    if args.watch and args.daemon:
+        parser.error("--watch and --daemon can't be combined")
+    if args.fingerprint and (args.watch or args.daemon):
+        # Watch and daemon mode rebuild single outputs and can't re-fingerprint
+        # the site
+        parser.error("--fingerprint can't be combined with --watch or --daemon")
+    if args.shard and args.merge:
+        parser.error("--shard and --merge can't be combined")
+    if args.shard and (args.watch or args.daemon or args.fingerprint):
+        # Pages in other shards would need this shard's static file hashes
+        # and rebuilds; shards are one-off builds
+        parser.error(
+            "--shard can't be combined with --watch, --daemon or --fingerprint"
+        )
+    if args.shard and args.check_links:
+        # Links into other shards would all look broken; check after --merge
+        parser.error("--check-links with --shard only works on the --merge step")
+    if args.merge is not None and args.merge < 1:
+        parser.error("--merge needs at least 1 shard")
+    if args.merge:
+        # The merge step only copies what the shards built; these options
+        # belong on the --shard builds or on a regular build
+        merge_conflicts = [
+            flag
+            for flag, value in (
+                ("--incremental", args.incremental),
+                ("--fingerprint", args.fingerprint),
+                ("--link-static", args.link_static),
+                ("--profile", args.profile),
+                ("--trace", args.trace),
+                ("--watch", args.watch),
+                ("--daemon", args.daemon),
+            )
+            if value
+        ]
+        if merge_conflicts:
+            parser.error(f"--merge can't be combined with {', '.join(merge_conflicts)}")
+
+    if args.merge:
+        merge_built_shards(args)
+        return
+
+    public_dir = PUBLIC_DIR
+    state_dir = STATE_DIR
+    if args.shard:
+        # Shard roots are never served and carry their state to --merge
+        public_dir = state_dir = shard_dir(PUBLIC_DIR, *args.shard)
+
+    # Walk the content and static trees once; every step below follows plan
+    plan = plan_build(CONTENT_DIR, STATIC_DIR, public_dir)
+    if args.shard:
+        plan = shard_plan(plan, CONTENT_DIR, *args.shard)
+    if args.dry_run:
+        for line in plan.describe():
+            print(line)
+        return
+
+    # The manifest is written on every build so a full build can be
+    # followed by incremental ones
+    manifest_path = os.path.join(state_dir, MANIFEST_NAME)
+    site_index_path = os.path.join(state_dir, SITE_INDEX_NAME)
+    os.makedirs(state_dir, exist_ok=True)
+    if args.incremental:
+        os.makedirs(public_dir, exist_ok=True)
+        manifest = Manifest.load(manifest_path)
+        site_index = SiteIndex.load(site_index_path)
+        if not site_index.pages:
+            # Missing or outdated index: pages must be parsed again to fill it
+            manifest.invalidate(os.path.join(CONTENT_DIR, ""))
+    else:
+        shutil.rmtree(public_dir, ignore_errors=True)
+        os.mkdir(public_dir)
+        manifest = Manifest(manifest_path)
+        site_index = SiteIndex(site_index_path)
+
+    plan.create_directories()
+    profiler = BuildProfiler() if args.profile or args.trace else None
+
+    cache = RenderCache(CACHE_DIR, args.cache_size << 20)
+    if args.clear_cache:
+        cache.clear()
+    if args.no_cache:
+        cache = None
+
+    # Copy static files to public folder, skipping ones already up to date
+    asset_urls = {} if args.fingerprint else None
+    sync_static(
+        STATIC_DIR,
+        public_dir,
+        manifest,
+        link=args.link_static,
+        profiler=profiler,
+        assets=asset_urls,
+        plan=plan,
+    )
+    assets = None
+    if asset_urls is not None:
+        assets = write_asset_manifest(public_dir, asset_urls, state_dir)
 
     # Generate HTML page from MD file to public folder
-    from_path = "/Users/derek/code/staticsitegen/content/"
-    dest_path = "/Users/derek/code/staticsitegen/public/"
-    template_path = "/Users/derek/code/staticsitegen/template.html"
-    generate_pages_recursive(from_path, template_path, dest_path)
+    if args.pipeline:
+        memo_hits, memo_misses = generate_pages_pipelined(
+            CONTENT_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            args.jobs,
+            manifest,
+            profiler,
+            cache,
+            site_index,
+            assets,
+            io_threads=args.io_threads,
+            plan=plan,
+        )
+    elif args.jobs > 1:
+        memo_hits, memo_misses = generate_pages_parallel(
+            CONTENT_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            args.jobs,
+            manifest,
+            profiler,
+            cache,
+            site_index,
+            assets,
+            plan=plan,
+        )
+    else:
+        hits, misses = block_memo_stats()
+        generate_pages_recursive(
+            CONTENT_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            manifest,
+            profiler,
+            cache,
+            site_index,
+            assets,
+            plan=plan,
+        )
+        after_hits, after_misses = block_memo_stats()
+        memo_hits, memo_misses = after_hits - hits, after_misses - misses
+    if memo_hits or memo_misses:
+        hit_rate = memo_hits / (memo_hits + memo_misses)
+        print(
+            f"Block memo: {memo_hits} hits, {memo_misses} misses "
+            f"({hit_rate:.0%} hit rate)"
+        )
+
+    # Delete outputs whose sources were removed and persist the new state
+    manifest.remove_stale()
+    manifest.save()
+    site_index.prune(manifest.outputs)
+    site_index.save()
+    if not args.shard:
+        # Written by the --merge step of a sharded build
+        write_sitemap(site_index, manifest, public_dir, args.site_url)
+        write_feed(
+            site_index,
+            public_dir,
+            args.site_url,
+            title=args.site_title,
+            author=args.site_author,
+        )
+
+    broken_links = 0
+    if args.check_links:
+        outputs = [entry["output"] for entry in manifest.outputs.values()]
+        broken_links = check_links(site_index, outputs, public_dir)
+    if cache is not None:
+        cache.evict()
+
+    if args.compress:
+        compress_tree(public_dir)
+
+    if profiler is not None:
+        profiler.report(args.profile_top)
+        if args.trace:
+            profiler.export_chrome_trace(args.trace)
+            print(f"Wrote build trace to {args.trace}")
+
+    if broken_links and not (args.watch or args.daemon):
+        sys.exit(1)
+
+    if args.watch:
+        on_rebuild = None
+        if args.live_reload:
+            on_rebuild = live_reload_notifier(args.live_reload, public_dir)
+        watch(
+            CONTENT_DIR,
+            STATIC_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            manifest,
+            on_rebuild,
+            cache=cache,
+            site_index=site_index,
+            site_url=args.site_url,
+            site_title=args.site_title,
+            site_author=args.site_author,
+        )
+
+    if args.daemon:
+        daemon = BuildDaemon(
+            CONTENT_DIR,
+            STATIC_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            manifest,
+            cache=cache,
+            site_index=site_index,
+            site_url=args.site_url,
+            site_title=args.site_title,
+            site_author=args.site_author,
+        )
+        daemon.listen(args.socket)
+        daemon.serve_forever()
+
+
+def merge_built_shards(args):
+    # The --merge step: combine the shard outputs, then do the whole-site
+    # work the shards skipped
+    try:
+        merged = merge_shards(
+            PUBLIC_DIR, args.merge, STATE_DIR, dry_run=args.dry_run
+        )
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Merge failed: {e}")
+    if merged is None:
+        return  # --dry-run
+    manifest, site_index = merged
+    write_sitemap(site_index, manifest, PUBLIC_DIR, args.site_url)
+    write_feed(
+        site_index,
+        PUBLIC_DIR,
+        args.site_url,
+        title=args.site_title,
+        author=args.site_author,
+    )
+    broken_links = 0
+    if args.check_links:
+        outputs = [entry["output"] for entry in manifest.outputs.values()]
+        broken_links = check_links(site_index, outputs, PUBLIC_DIR)
+    if args.compress:
+        # After the sitemap and feed, so they are compressed too
+        compress_tree(PUBLIC_DIR)
+    if broken_links:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
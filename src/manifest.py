@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+
+from atomic import write_atomic
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    # Records the source hashes each output was built from, so later builds
+    # only redo outputs whose inputs changed. "files" caches hashes by
+    # (size, mtime) so unchanged sources are not re-read on every run.
+    def __init__(self, path, files=None, outputs=None):
+        self.path = path
+        self.files = files if files is not None else {}
+        self.outputs = outputs if outputs is not None else {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("files"), data.get("outputs"))
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "files": self.files,
+            "outputs": self.outputs,
+        }
+        # dumps() encodes in C; dump() to a file goes through the pure-Python
+        # encoder, which dominates warm rebuilds of large sites
+        write_atomic(
+            self.path, [json.dumps(data, separators=(",", ":"), sort_keys=True)]
+        )
+
+    def hash(self, path, stat=None):
+        # stat, when the caller already has it, saves a system call
+        if stat is None:
+            stat = os.stat(path)
+        cached = self.files.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hash_file(path)
+        self.files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def needs_build(self, source, digest, output):
+        # Marks source as seen so remove_stale() keeps its output
+        self.seen.add(source)
+        entry = self.outputs.get(source)
+        if entry is None or entry["digest"] != digest or entry["output"] != output:
+            return True
+        return not os.path.exists(output)
+
+    def record(self, source, digest, output):
+        self.seen.add(source)
+        self.outputs[source] = {"digest": digest, "output": output}
+
+    def invalidate(self, prefix=""):
+        # Forces sources under prefix to be rebuilt by forgetting what their
+        # outputs were built from. The outputs themselves are kept, so
+        # remove_stale() can still delete those of removed sources.
+        for source, entry in self.outputs.items():
+            if source.startswith(prefix):
+                entry["digest"] = None
+
+    def remove(self, source):
+        # Forget source and delete the output built from it
+        entry = self.outputs.pop(source, None)
+        self.files.pop(source, None)
+        self.seen.discard(source)
+        if entry is None or not os.path.isfile(entry["output"]):
+            return None
+        output = entry["output"]
+        print(f"Removing stale output {output}")
+        os.remove(output)
+        _prune_empty_dirs(os.path.dirname(output), os.path.dirname(self.path))
+        return output
+
+    def remove_stale(self, prefix=""):
+        # Only sources under prefix are considered, so one tree can be
+        # cleaned up before the rest of the build has run
+        removed = []
+        for source in sorted(set(self.outputs) - self.seen):
+            if not source.startswith(prefix):
+                continue
+            output = self.remove(source)
+            if output is not None:
+                removed.append(output)
+        return removed
+
+
+def _prune_empty_dirs(path, root):
+    # Remove directories left empty by deleted outputs, stopping at root
+    root = os.path.abspath(root)
+    path = os.path.abspath(path)
+    while path != root and path.startswith(root + os.sep):
+        try:
+            os.rmdir(path)
+        except OSError:
+            return
+        path = os.path.dirname(path)
@@ -0,0 +1,279 @@
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from constants import (
+    PIPELINE_IO_THREADS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_SATURATION,
+    STREAM_THRESHOLD_BYTES,
+)
+from generate_page import (
+    recorded_digest,
+    render_page,
+    stale_pages,
+    write_page_streaming,
+)
+from helpers import block_memo_stats
+from plan import ensure_plan
+from profiler import BuildProfiler
+
+# Put on a queue once per consumer when its producers are finished
+_DONE = None
+
+
+class StageClock:
+    # Time one pipeline stage spent working, summed over its threads or
+    # worker processes. Busy time over wall time times the number of workers
+    # says how saturated the stage was.
+    def __init__(self, name, workers, unit):
+        self.name = name
+        self.workers = workers
+        self.unit = unit
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.busy += seconds
+
+    def utilization(self, elapsed):
+        if elapsed <= 0:
+            return 0.0
+        return self.busy / (elapsed * self.workers)
+
+
+def _render_page_job(job: tuple):
+    # Runs on a CPU worker, a process (or with one job, a thread). Returns
+    # (error, page HTML, metadata, busy seconds, profiler events,
+    # (block memo hits, misses)). The page is None when it was too large to
+    # hold in memory and has been streamed to disk here instead.
+    from_path, markdown, template_path, dest_path, profile, cache, assets = job
+    start = time.perf_counter()
+    hits, misses = block_memo_stats()
+    try:
+        if markdown is None:
+            page = None
+            metadata = write_page_streaming(
+                from_path, template_path, dest_path, assets
+            )
+        else:
+            page, metadata = render_page(
+                from_path, markdown, template_path, dest_path, cache, assets
+            )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return error, None, None, time.perf_counter() - start, [], (0, 0)
+    end = time.perf_counter()
+    events = []
+    if profile:
+        profiler = BuildProfiler()
+        profiler.record("render", from_path, start, end, len(page or ""))
+        events = profiler.events
+    after_hits, after_misses = block_memo_stats()
+    memo = (after_hits - hits, after_misses - misses)
+    return None, page, metadata, end - start, events, memo
+
+
+def generate_pages_pipelined(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    jobs: int,
+    manifest=None,
+    profiler=None,
+    cache=None,
+    site_index=None,
+    assets=None,
+    io_threads=PIPELINE_IO_THREADS,
+    queue_size=PIPELINE_QUEUE_SIZE,
+    plan=None,
+) -> tuple:
+    # Builds pages in three overlapping stages: io_threads threads read the
+    # sources, `jobs` CPU workers parse and render them, and io_threads
+    # threads write the results. Bounded queues connect the stages, so at
+    # most about 3 * queue_size pages are held in memory and a fast stage
+    # waits for a slow one instead of running ahead. Prints how busy each
+    # stage was. The pages come from plan, planned here if not given.
+    # Returns the (hits, misses) of the workers' block memos.
+    plan = ensure_plan(plan, dir_path_content, None, dest_dir_path)
+    pages, digests = stale_pages(manifest, plan, template_path, assets, site_index)
+    if not pages:
+        return 0, 0
+
+    profile = profiler is not None
+    read_clock = StageClock("read", io_threads, "thread")
+    render_clock = StageClock("render", jobs, "worker")
+    write_clock = StageClock("write", io_threads, "thread")
+    read_queue = queue.Queue(queue_size)
+    # Render futures in submission order; its bound caps pages in flight
+    render_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    work = iter(pages)
+    work_lock = threading.Lock()
+    # Filled from several threads; list.append is atomic
+    built = []
+    failures = []
+    memo = [0, 0]
+
+    def read():
+        while True:
+            with work_lock:
+                item = next(work, None)
+            if item is None:
+                break
+            from_path, dest_path = item
+            start = time.perf_counter()
+            markdown = error = None
+            try:
+                if plan.stat(from_path).st_size <= STREAM_THRESHOLD_BYTES:
+                    with open(from_path) as f:
+                        markdown = f.read()
+            except Exception as e:
+                # Also undecodable files; a dead reader would hang the build
+                error = f"{type(e).__name__}: {e}"
+            end = time.perf_counter()
+            read_clock.add(end - start)
+            if profile:
+                profiler.record("read", from_path, start, end, len(markdown or ""))
+            read_queue.put((from_path, dest_path, markdown, error))
+        read_queue.put(_DONE)
+
+    def collect():
+        # Takes renders in submission order, so the log follows read order
+        while (item := render_queue.get()) is not _DONE:
+            from_path, dest_path, future, error = item
+            page = metadata = None
+            if future is not None:
+                try:
+                    error, page, metadata, busy, events, (hits, misses) = (
+                        future.result()
+                    )
+                except Exception as e:
+                    # The worker died; report the page rather than hang
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    render_clock.add(busy)
+                    memo[0] += hits
+                    memo[1] += misses
+                    if profile:
+                        profiler.extend(events)
+            print(
+                f"Generating page from {from_path} to {dest_path} using {template_path}"
+            )
+            if error is not None:
+                print(f"Error generating page {from_path}: {error}")
+                failures.append(from_path)
+            elif page is None:
+                built.append((from_path, dest_path, metadata))
+            else:
+                write_queue.put((from_path, dest_path, page, metadata))
+        for _ in range(io_threads):
+            write_queue.put(_DONE)
+
+    def write():
+        while (item := write_queue.get()) is not _DONE:
+            from_path, dest_path, page, metadata = item
+            start = time.perf_counter()
+            try:
+                with open(dest_path, "w") as f:
+                    f.write(page)
+            except Exception as e:
+                # A dead writer would leave the queue full and the build hung
+                print(f"Error generating page {from_path}: {type(e).__name__}: {e}")
+                failures.append(from_path)
+                continue
+            end = time.perf_counter()
+            write_clock.add(end - start)
+            if profile:
+                profiler.record("write", from_path, start, end, len(page))
+            built.append((from_path, dest_path, metadata))
+
+    start = time.perf_counter()
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+    else:
+        # Rendering in a thread still overlaps with the I/O threads, which
+        # release the GIL while they wait on the disk
+        executor = ThreadPoolExecutor(max_workers=1)
+    threads = [threading.Thread(target=read) for _ in range(io_threads)]
+    threads += [threading.Thread(target=write) for _ in range(io_threads)]
+    threads.append(threading.Thread(target=collect))
+    with executor:
+        for thread in threads:
+            thread.start()
+        # Hand read pages to the CPU workers until every reader is done
+        readers = io_threads
+        while readers:
+            item = read_queue.get()
+            if item is _DONE:
+                readers -= 1
+                continue
+            from_path, dest_path, markdown, error = item
+            future = None
+            if error is None:
+                job = (
+                    from_path,
+                    markdown,
+                    template_path,
+                    dest_path,
+                    profile,
+                    cache,
+                    assets,
+                )
+                try:
+                    future = executor.submit(_render_page_job, job)
+                except Exception as e:
+                    # A broken pool; report the page and keep draining
+                    error = f"{type(e).__name__}: {e}"
+            render_queue.put((from_path, dest_path, future, error))
+        render_queue.put(_DONE)
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    _report(len(pages), elapsed, [read_clock, render_clock, write_clock])
+
+    # Record results in page order so the manifest and index are deterministic
+    order = {from_path: number for number, (from_path, _) in enumerate(pages)}
+    for from_path, dest_path, metadata in sorted(built, key=lambda b: order[b[0]]):
+        if manifest is not None:
+            digest = recorded_digest(
+                digests[from_path],
+                site_index,
+                assets,
+                template_path,
+                dest_path,
+                metadata,
+            )
+            manifest.record(from_path, digest, dest_path)
+        if site_index is not None:
+            source_hash = None
+            if manifest is not None:
+                source_hash = manifest.hash(from_path, plan.stats.get(from_path))
+            site_index.update(from_path, dest_path, source_hash, metadata)
+    if failures:
+        raise RuntimeError(f"{len(failures)} page(s) failed to generate")
+    return memo[0], memo[1]
+
+
+def _report(pages, elapsed, clocks):
+    stages = ", ".join(
+        f"{clock.name} {clock.utilization(elapsed):.0%} busy "
+        f"({clock.workers} {clock.unit}{'s' if clock.workers != 1 else ''})"
+        for clock in clocks
+    )
+    print(
+        f"Pipeline: {pages} pages in {elapsed:.2f}s, {stages}: "
+        f"{_bottleneck(elapsed, clocks)}"
+    )
+
+
+def _bottleneck(elapsed, clocks):
+    # The busiest stage limits the build only if it is close to saturated;
+    # otherwise the time went to waiting, such as startup or a short build
+    busiest = max(clocks, key=lambda clock: clock.utilization(elapsed))
+    if busiest.utilization(elapsed) < PIPELINE_SATURATION:
+        return "no stage saturated"
+    bound = "CPU" if busiest.name == "render" else "I/O"
+    return f"{bound}-bound ({busiest.name})"
@@ -0,0 +1,83 @@
+import os
+
+
+class BuildPlan:
+    # Everything a build writes, decided by one walk of the source trees:
+    # output directories to create, then pages to render and static files to
+    # copy as (source, output) pairs. The stat result os.scandir gave for each
+    # source is kept, so executors and the manifest don't stat it again.
+    def __init__(self):
+        # Insertion-ordered set; parents come before their children
+        self.directories = {}
+        self.pages = []
+        self.copies = []
+        self.stats = {}
+
+    def __len__(self):
+        return len(self.directories) + len(self.pages) + len(self.copies)
+
+    def create_directories(self):
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+
+    def stat(self, path):
+        # The planned stat of a source, or a fresh one for paths not planned
+        file_stat = self.stats.get(path)
+        return file_stat if file_stat is not None else os.stat(path)
+
+    def describe(self):
+        # One line per step and a summary, as printed by --dry-run
+        lines = [f"mkdir {directory}" for directory in self.directories]
+        lines += [f"render {source} -> {output}" for source, output in self.pages]
+        lines += [f"copy {source} -> {output}" for source, output in self.copies]
+        lines.append(
+            f"Plan: {len(self.directories)} directories, {len(self.pages)} pages, "
+            f"{len(self.copies)} static files ({len(self)} steps)"
+        )
+        return lines
+
+
+def plan_build(content_dir=None, static_dir=None, public_dir="public"):
+    # Walk content_dir and static_dir (either may be None) once each and
+    # return the BuildPlan that builds them into public_dir. Nothing on disk
+    # is changed.
+    plan = BuildPlan()
+    plan.directories[os.path.normpath(public_dir)] = None
+    if content_dir is not None:
+        if not os.path.exists(content_dir):
+            raise ValueError("Source directory does not exist")
+        _walk(content_dir, public_dir, plan, plan.pages, page_output_name)
+    if static_dir is not None:
+        if not os.path.exists(static_dir):
+            raise ValueError("Source path does not exist")
+        _walk(static_dir, os.path.normpath(public_dir), plan, plan.copies, None)
+    return plan
+
+
+def ensure_plan(plan, content_dir=None, static_dir=None, public_dir="public"):
+    # plan itself or, for executors called without one, a plan of just the
+    # given trees with its output directories created
+    if plan is None:
+        plan = plan_build(content_dir, static_dir, public_dir)
+        plan.create_directories()
+    return plan
+
+
+def page_output_name(name):
+    # Change file extension
+    return name[:-2] + "html"
+
+
+def _walk(source_dir, dest_dir, plan, steps, rename):
+    # Sorted, so plans and the builds that follow them are deterministic
+    with os.scandir(source_dir) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_file():
+            name = rename(entry.name) if rename is not None else entry.name
+            steps.append((entry.path, os.path.join(dest_dir, name)))
+            plan.stats[entry.path] = entry.stat()
+        else:
+            dest_subdir = os.path.join(dest_dir, entry.name)
+            plan.directories[dest_subdir] = None
+            _walk(entry.path, dest_subdir, plan, steps, rename)
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+
+# Stages that make up a page build, in pipeline order
+PAGE_STAGES = (
+    "read",
+    "cache_read",
+    "block_split",
+    "inline_parse",
+    "render",
+    "template",
+    "write",
+    # Instead of all of the above, for pages too large to hold in memory
+    "stream",
+)
+
+
+class BuildProfiler:
+    # Records wall time and output size per (stage, file). Events are plain
+    # tuples so worker processes can send theirs back to the parent.
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, path, start, end, size=0):
+        event = (
+            stage,
+            path,
+            start,
+            end - start,
+            size,
+            os.getpid(),
+            threading.get_ident(),
+        )
+        with self._lock:
+            self.events.append(event)
+
+    def timer(self, stage, path):
+        # Returns a function to call when the stage ends, with the bytes it
+        # produced: done = profiler.timer("read", path); ...; done(len(data))
+        start = time.perf_counter()
+
+        def done(size=0):
+            self.record(stage, path, start, time.perf_counter(), size)
+
+        return done
+
+    def extend(self, events):
+        with self._lock:
+            self.events.extend(events)
+
+    def stage_totals(self):
+        totals = {}
+        for stage, _, _, duration, size, _, _ in self.events:
+            total = totals.setdefault(stage, [0, 0.0, 0])
+            total[0] += 1
+            total[1] += duration
+            total[2] += size
+        return totals
+
+    def slowest_pages(self, top):
+        pages = {}
+        for stage, path, _, duration, _, _, _ in self.events:
+            if stage in PAGE_STAGES:
+                pages[path] = pages.get(path, 0.0) + duration
+        return sorted(pages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    def report(self, top=10):
+        print(f"Slowest {top} pages:")
+        for path, duration in self.slowest_pages(top):
+            print(f"  {duration * 1000:10.2f} ms  {path}")
+        print("Totals per stage:")
+        totals = self.stage_totals()
+        order = list(PAGE_STAGES) + sorted(set(totals) - set(PAGE_STAGES))
+        for stage in order:
+            if stage in totals:
+                count, duration, size = totals[stage]
+                print(
+                    f"  {stage:<14} {duration * 1000:10.2f} ms "
+                    f"{size / 1024:12.1f} KiB  {count} file(s)"
+                )
+
+    def export_chrome_trace(self, path):
+        # Trace Event Format "complete" events, loadable in chrome://tracing
+        # or Perfetto; timestamps are microseconds
+        trace_events = [
+            {
+                "name": stage,
+                "cat": "build",
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": {"file": file_path, "bytes": size},
+            }
+            for stage, file_path, start, duration, size, pid, tid in self.events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
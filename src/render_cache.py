@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from atomic import write_atomic
+
+# Modules whose code decides what HTML a page body renders to; editing any of
+# them changes the parser version and with it every cache key
+PARSER_MODULES = ("constants.py", "helpers.py", "htmlnode.py", "textnode.py")
+
+_parser_version = None
+
+
+def parser_version():
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256()
+        source_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in PARSER_MODULES:
+            with open(os.path.join(source_dir, name), "rb") as f:
+                digest.update(f.read())
+        _parser_version = digest.hexdigest()[:16]
+    return _parser_version
+
+
+class RenderCache:
+    # Rendered body HTML and metadata of each page, one file per entry (a
+    # JSON metadata line followed by the HTML), keyed by the hash of the
+    # page's markdown and the parser version. Template-only changes then skip
+    # parsing entirely. Hits touch the entry's mtime, so evict() can drop
+    # least recently used entries without a shared index, which keeps the
+    # cache safe to use from several worker processes at once.
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def key(self, markdown):
+        digest = hashlib.sha256(parser_version().encode())
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".html")
+
+    def get(self, key):
+        # Returns (html, metadata), or None on a miss
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                metadata = json.loads(f.readline())
+                html = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # Evicted by another process in the meantime
+        return html, metadata
+
+    def put(self, key, html, metadata):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Workers may store the same key concurrently
+        write_atomic(path, [json.dumps(metadata, separators=(",", ":")), "\n", html])
+
+    def evict(self):
+        # Delete least recently used entries until the cache fits max_bytes.
+        # Returns the number of entries removed.
+        entries = []
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+        start = time.perf_counter()
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        elapsed = time.perf_counter() - start
+        print(f"Evicted {evicted} render cache entries in {elapsed:.2f}s")
+        return evicted
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
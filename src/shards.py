@@ -0,0 +1,151 @@
+import argparse
+import os
+import shutil
+import time
+import zlib
+
+from copy_static import copy_static_file
+from manifest import Manifest, MANIFEST_NAME
+from plan import BuildPlan
+from site_index import SiteIndex, SITE_INDEX_NAME
+
+# Per-shard state that merge_shards combines instead of copying
+SHARD_STATE_NAMES = (MANIFEST_NAME, SITE_INDEX_NAME)
+
+
+def parse_shard(value):
+    # "2/4" -> (2, 4); shards are numbered from 1
+    index, _, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected i/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard {value} is out of range")
+    return index, count
+
+
+def shard_dir(public_dir, index, count):
+    # Output root of one shard, next to the merged output
+    return f"{os.path.normpath(public_dir)}.shard-{index}-of-{count}"
+
+
+def shard_of(source, content_dir, count):
+    # The shard (from 1) a page belongs to. The hash is of the page's path
+    # relative to the content directory, so every machine agrees on it
+    # wherever its checkout lives.
+    rel_path = os.path.relpath(source, content_dir).replace(os.sep, "/")
+    return zlib.crc32(rel_path.encode()) % count + 1
+
+
+def shard_plan(plan, content_dir, index, count):
+    # The part of plan that shard index of count builds: its share of the
+    # pages and, for shard 1 only, the static files
+    shard = BuildPlan()
+    shard.directories = plan.directories
+    shard.stats = plan.stats
+    shard.pages = [
+        (source, output)
+        for source, output in plan.pages
+        if shard_of(source, content_dir, count) == index
+    ]
+    if index == 1:
+        shard.copies = plan.copies
+    return shard
+
+
+def _shard_files(root):
+    # Relative paths of the files a shard built, without its state files
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.relpath(os.path.join(directory, name), root)
+            if path not in SHARD_STATE_NAMES:
+                files.append(path)
+    return files
+
+
+def _rebase(path, root, public_dir):
+    return os.path.join(public_dir, os.path.relpath(path, root))
+
+
+def merge_shards(public_dir, count, state_dir, dry_run=False):
+    # Combine the output roots of shards 1..count into public_dir, replacing
+    # it, along with one manifest and site index covering every shard, saved
+    # in state_dir. Each shard keeps its own state in its root. Files
+    # are copied, not linked, since later builds rewrite pages in place.
+    # Raises before anything is written if a shard is missing or two shards
+    # built the same output or source. With dry_run, prints the copies it
+    # would make and returns None without touching the disk.
+    # Returns (merged manifest, merged site index).
+    start = time.perf_counter()
+    public_dir = os.path.normpath(public_dir)
+    roots = [shard_dir(public_dir, index, count) for index in range(1, count + 1)]
+    for index, root in enumerate(roots, 1):
+        if not os.path.exists(os.path.join(root, MANIFEST_NAME)):
+            raise ValueError(f"Shard {index}/{count} has not been built: {root}")
+
+    owners = {}
+    sources = {}
+    conflicts = []
+    shards = []
+    for index, root in enumerate(roots, 1):
+        manifest = Manifest.load(os.path.join(root, MANIFEST_NAME))
+        site_index = SiteIndex.load(os.path.join(root, SITE_INDEX_NAME))
+        files = _shard_files(root)
+        for path in files:
+            if path in owners:
+                conflicts.append(f"{path} built by shards {owners[path]} and {index}")
+            else:
+                owners[path] = index
+        for source in manifest.outputs:
+            if source in sources:
+                conflicts.append(
+                    f"{source} built by shards {sources[source]} and {index}"
+                )
+            else:
+                sources[source] = index
+        shards.append((root, manifest, site_index, files))
+    if conflicts:
+        for conflict in conflicts:
+            print(f"Conflict: {conflict}")
+        raise RuntimeError(f"{len(conflicts)} conflict(s) between shards")
+    if dry_run:
+        for root, _, _, files in shards:
+            for path in files:
+                source = os.path.join(root, path)
+                print(f"copy {source} -> {os.path.join(public_dir, path)}")
+        print(f"Merge plan: {count} shards, {len(owners)} files into {public_dir}")
+        return None
+
+    shutil.rmtree(public_dir, ignore_errors=True)
+    os.mkdir(public_dir)
+    os.makedirs(state_dir, exist_ok=True)
+    merged_manifest = Manifest(os.path.join(state_dir, MANIFEST_NAME))
+    merged_index = SiteIndex(os.path.join(state_dir, SITE_INDEX_NAME))
+    for root, manifest, site_index, files in shards:
+        for path in files:
+            dest_path = os.path.join(public_dir, path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            copy_static_file(os.path.join(root, path), dest_path)
+        # Cached source hashes; the template's entry is the same in every shard
+        merged_manifest.files.update(manifest.files)
+        for source, entry in manifest.outputs.items():
+            output = _rebase(entry["output"], root, public_dir)
+            merged_manifest.outputs[source] = {
+                "digest": entry["digest"],
+                "output": output,
+            }
+        for source, page in site_index.pages.items():
+            merged_index.pages[source] = dict(
+                page, output=_rebase(page["output"], root, public_dir)
+            )
+    merged_manifest.save()
+    merged_index.save()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Merged {count} shards into {public_dir}: {len(owners)} files, "
+        f"{len(merged_index.pages)} pages in {elapsed:.2f}s"
+    )
+    return merged_manifest, merged_index
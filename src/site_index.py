@@ -0,0 +1,54 @@
+import json
+
+from atomic import write_atomic
+
+SITE_INDEX_NAME = ".site-index.json"
+SITE_INDEX_VERSION = 3
+
+
+class SiteIndex:
+    # Title, date, headings, outbound links, images, word count and source
+    # hash of every page, keyed by source path. Entries come from the
+    # metadata the build collects while parsing, so listing pages never
+    # re-reads the sources. Like the manifest it is loaded by incremental
+    # builds, which only replace the entries of pages they rebuild.
+    def __init__(self, path, pages=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != SITE_INDEX_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages"))
+
+    def save(self):
+        data = {"version": SITE_INDEX_VERSION, "pages": self.pages}
+        write_atomic(
+            self.path, [json.dumps(data, separators=(",", ":"), sort_keys=True)]
+        )
+
+    def update(self, source, output, source_hash, metadata):
+        self.pages[source] = {
+            "output": output,
+            "hash": source_hash,
+            "title": metadata["title"],
+            "date": metadata.get("date"),
+            "headings": [list(heading) for heading in metadata["headings"]],
+            "links": list(metadata["links"]),
+            "images": list(metadata["images"]),
+            "words": metadata["words"],
+        }
+
+    def remove(self, source):
+        self.pages.pop(source, None)
+
+    def prune(self, sources):
+        # Drop pages whose source is no longer part of the site
+        for source in set(self.pages) - set(sources):
+            del self.pages[source]
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from atomic import write_atomic
+
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+SITEMAP_STATE_NAME = ".sitemap-state.json"
+
+# URLs per sitemap shard, on average. The spec allows 50,000 per file; smaller
+# shards mean less to rewrite when a page changes.
+SITEMAP_SHARD_ENTRIES = 1000
+FEED_MAX_ENTRIES = 20
+
+SITEMAP_XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_XMLNS = "http://www.w3.org/2005/Atom"
+
+
+def page_url(output, public_dir, site_url):
+    # index.html pages are linked by their directory, as the server serves them
+    prefix = os.path.join(public_dir, "")
+    if output.startswith(prefix):
+        path = output[len(prefix) :]
+    else:
+        path = os.path.relpath(output, public_dir)
+    path = path.replace(os.sep, "/")
+    if path == "index.html":
+        path = ""
+    elif path.endswith("/index.html"):
+        path = path[: -len("index.html")]
+    return f"{site_url.rstrip('/')}/{path}"
+
+
+def _shard_count(pages):
+    # A power of two, so shard membership only changes when the site doubles
+    count = 1
+    while count * SITEMAP_SHARD_ENTRIES < pages:
+        count *= 2
+    return count
+
+
+def _sitemap_chunks(entries):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<urlset xmlns="{SITEMAP_XMLNS}">\n'
+    for url, lastmod in entries:
+        yield f"<url><loc>{escape(url)}</loc><lastmod>{lastmod}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def _sitemap_index_chunks(shard_urls):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<sitemapindex xmlns="{SITEMAP_XMLNS}">\n'
+    for url in shard_urls:
+        yield f"<sitemap><loc>{escape(url)}</loc></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def write_sitemap(site_index, manifest, public_dir, site_url):
+    # sitemap.xml is an index of shards; each page belongs to the shard picked
+    # by a hash of its URL. Only shards whose entries differ from the last
+    # build (per the digests in the state file, kept next to the manifest)
+    # are written again, so adding one page rewrites one shard rather than
+    # the whole sitemap.
+    # Returns the number of shards written.
+    start = time.perf_counter()
+    state_path = os.path.join(os.path.dirname(manifest.path), SITEMAP_STATE_NAME)
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    count = _shard_count(len(site_index.pages))
+    shards = [[] for _ in range(count)]
+    for source, page in site_index.pages.items():
+        url = page_url(page["output"], public_dir, site_url)
+        # The source's mtime as of its last hash, which the manifest keeps
+        cached = manifest.files.get(source)
+        modified = cached[1] / 1e9 if cached else os.stat(source).st_mtime
+        lastmod = time.strftime("%Y-%m-%d", time.gmtime(modified))
+        shards[zlib.crc32(url.encode()) % count].append((url, lastmod))
+
+    old_digests = state.get("shards", [])
+    digests = []
+    written = 0
+    for number, entries in enumerate(shards):
+        entries.sort()
+        digest = hashlib.sha256()
+        for url, lastmod in entries:
+            digest.update(f"{url} {lastmod}\n".encode())
+        digest = digest.hexdigest()
+        digests.append(digest)
+        path = os.path.join(public_dir, f"sitemap-{number}.xml")
+        if (
+            number < len(old_digests)
+            and old_digests[number] == digest
+            and os.path.exists(path)
+        ):
+            continue
+        write_atomic(path, _sitemap_chunks(entries))
+        written += 1
+    # Shards left over from a larger shard count
+    for number in range(count, len(old_digests)):
+        try:
+            os.remove(os.path.join(public_dir, f"sitemap-{number}.xml"))
+        except FileNotFoundError:
+            pass
+
+    index_path = os.path.join(public_dir, SITEMAP_NAME)
+    if written or len(old_digests) != count or not os.path.exists(index_path):
+        shard_urls = [
+            f"{site_url.rstrip('/')}/sitemap-{number}.xml" for number in range(count)
+        ]
+        write_atomic(index_path, _sitemap_index_chunks(shard_urls))
+    write_atomic(state_path, [json.dumps({"shards": digests})])
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Sitemap: {len(site_index.pages)} URLs in {count} shard(s), "
+        f"{written} rewritten in {elapsed:.2f}s"
+    )
+    return written
+
+
+def _feed_date(value):
+    # Front-matter dates are ISO 8601, with or without a time; naive ones
+    # are taken as UTC
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def _feed_chunks(entries, site_url, title, author):
+    updated = entries[0][0].isoformat() if entries else "1970-01-01T00:00:00+00:00"
+    root_url = site_url.rstrip("/") + "/"
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<feed xmlns="{ATOM_XMLNS}">\n'
+    yield f"<id>{escape(root_url)}</id>\n"
+    yield f"<title>{escape(title)}</title>\n"
+    # Atom requires an author on the feed unless every entry has one
+    yield f"<author><name>{escape(author)}</name></author>\n"
+    yield f"<updated>{updated}</updated>\n"
+    yield f'<link rel="self" href="{escape(root_url + FEED_NAME)}"/>\n'
+    for date, url, title in entries:
+        yield (
+            f"<entry><id>{escape(url)}</id><title>{escape(title)}</title>"
+            f'<link href="{escape(url)}"/><updated>{date.isoformat()}</updated>'
+            "</entry>\n"
+        )
+    yield "</feed>\n"
+
+
+def write_feed(
+    site_index,
+    public_dir,
+    site_url,
+    max_entries=FEED_MAX_ENTRIES,
+    title=None,
+    author=None,
+):
+    # Atom feed of the newest pages that have a front-matter date. The feed
+    # is small, so it is rewritten whenever its contents change. title
+    # defaults to site_url and author to title.
+    # Returns True if feed.xml was written.
+    title = title or site_url
+    author = author or title
+    entries = []
+    for source, page in site_index.pages.items():
+        if not page.get("date"):
+            continue
+        try:
+            date = _feed_date(page["date"])
+        except ValueError:
+            print(f"Skipping {source} in the feed: invalid date {page['date']!r}")
+            continue
+        url = page_url(page["output"], public_dir, site_url)
+        entries.append((date, url, page["title"]))
+    entries.sort(reverse=True)
+    del entries[max_entries:]
+
+    path = os.path.join(public_dir, FEED_NAME)
+    feed = "".join(_feed_chunks(entries, site_url, title, author))
+    try:
+        with open(path) as f:
+            if f.read() == feed:
+                return False
+    except FileNotFoundError:
+        pass
+    write_atomic(path, [feed])
+    print(f"Feed: wrote {len(entries)} entries to {path}")
+    return True
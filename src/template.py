@@ -0,0 +1,63 @@
+import os
+
+from constants import template_placeholder_pattern
+
+
+class Template:
+    # A template compiled into static segments with placeholder slots between
+    # them, so rendering a page is a single join instead of one full-string
+    # replace per placeholder
+    def __init__(self, source):
+        self.segments = []
+        self.slots = []
+        position = 0
+        for match in template_placeholder_pattern.finditer(source):
+            self.segments.append(source[position : match.start()])
+            self.slots.append(match.group(1).lower())
+            position = match.end()
+        self.segments.append(source[position:])
+
+    def render(self, context):
+        chunks = []
+        self.render_into(chunks.append, context)
+        return "".join(chunks)
+
+    def render_into(self, write, context):
+        # context keys are lowercase placeholder names; missing ones render
+        # empty. HTMLNode values are streamed rather than converted to a string
+        write(self.segments[0])
+        for name, segment in zip(self.slots, self.segments[1:]):
+            value = context.get(name, "")
+            if hasattr(value, "render_into"):
+                value.render_into(write)
+            else:
+                write(str(value))
+            write(segment)
+
+    def __eq__(self, template):
+        return self.segments == template.segments and self.slots == template.slots
+
+    def __repr__(self):
+        return f"Template({self.segments}, {self.slots})"
+
+
+# Compiled templates for the lifetime of the process, keyed by path and
+# invalidated when the file on disk changes
+_template_cache = {}
+
+
+def load_template(template_path, assets=None):
+    # With an AssetMap, references to static files in the template point at
+    # their fingerprinted copies
+    stat = os.stat(template_path)
+    key = (stat.st_size, stat.st_mtime_ns, assets.key if assets is not None else None)
+    cached = _template_cache.get(template_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(template_path) as f:
+        source = f.read()
+    if assets is not None:
+        source = assets.rewrite_html(source)
+    template = Template(source)
+    _template_cache[template_path] = (key, template)
+    return template
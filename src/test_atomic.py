@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from atomic import write_atomic
+from fixtures import read_file, write_file
+
+
+class TestWriteAtomic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "out.txt")
+
+    def test_replaces_file(self):
+        write_file(self.path, "old")
+        write_atomic(self.path, ["new ", "text"])
+        self.assertEqual(read_file(self.path), "new text")
+        self.assertEqual(os.listdir(self.tmp.name), ["out.txt"])
+
+    def test_bytes_and_times(self):
+        write_atomic(self.path, [b"data"], "wb", (0, 1_000_000_000))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"data")
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1_000_000_000)
+
+    def test_failure_keeps_old_file(self):
+        write_file(self.path, "old")
+
+        def chunks():
+            yield "partial"
+            raise RuntimeError("interrupted")
+
+        with self.assertRaises(RuntimeError):
+            write_atomic(self.path, chunks())
+        self.assertEqual(read_file(self.path), "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["out.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from check_links import check_links, find_broken_links, resolve_target
+from site_index import SiteIndex
+
+
+class TestResolveTarget(unittest.TestCase):
+    def test_resolve_target(self):
+        page = "/public/blog/post/index.html"
+        self.assertEqual(resolve_target("/", page, "/public"), "/public")
+        self.assertEqual(
+            resolve_target("/images/a.png", page, "/public"), "/public/images/a.png"
+        )
+        self.assertEqual(
+            resolve_target("../other?x=1#top", page, "/public"), "/public/blog/other"
+        )
+        self.assertIsNone(resolve_target("https://example.com/", page, "/public"))
+        self.assertIsNone(resolve_target("mailto:me@example.com", page, "/public"))
+        self.assertIsNone(resolve_target("#section", page, "/public"))
+
+
+class TestCheckLinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "post.md")
+        with open(self.source, "w") as f:
+            f.write(
+                "# Post\n\n"
+                "[home](/) and [gone](/missing)\n\n"
+                "![pic](/images/a.png) ![lost](/images/b.png)\n\n"
+                "[again](/missing) [sibling](../other)\n"
+            )
+        self.index = SiteIndex(os.path.join(self.tmp.name, "index.json"))
+        self.index.pages[self.source] = {
+            "output": "/public/blog/post/index.html",
+            "links": ["/", "/missing", "/missing", "../other"],
+            "images": ["/images/a.png", "/images/b.png"],
+        }
+        self.outputs = [
+            "/public/index.html",
+            "/public/blog/post/index.html",
+            "/public/blog/other/index.html",
+            "/public/images/a.png",
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_broken_links(self):
+        self.assertEqual(
+            find_broken_links(self.index, self.outputs, "/public"),
+            [
+                (self.source, "/missing", "link"),
+                (self.source, "/missing", "link"),
+                (self.source, "/images/b.png", "image"),
+            ],
+        )
+
+    def test_reports_source_lines(self):
+        log = StringIO()
+        with redirect_stdout(log):
+            self.assertEqual(check_links(self.index, self.outputs, "/public"), 3)
+        lines = log.getvalue().splitlines()
+        self.assertEqual(
+            lines[:3],
+            [
+                f"{self.source}:3: broken link /missing",
+                f"{self.source}:7: broken link /missing",
+                f"{self.source}:5: broken image /images/b.png",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
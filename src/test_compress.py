@@ -0,0 +1,55 @@
+import gzip
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from compress import compress_tree
+
+
+class TestCompressTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = os.path.join(self.root, "index.html")
+        with open(self.page, "w") as f:
+            f.write("<p>Lots of text</p>" * 200)
+        with open(os.path.join(self.root, "small.css"), "w") as f:
+            f.write("body {}")
+        with open(os.path.join(self.root, "image.png"), "wb") as f:
+            f.write(b"\x89PNG" * 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compress(self):
+        with redirect_stdout(StringIO()):
+            return compress_tree(self.root, jobs=2)
+
+    def test_compresses_large_text_files_only(self):
+        self.assertEqual(self.compress(), 1)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.root) if name.endswith(".gz")),
+            ["index.html.gz"],
+        )
+        with gzip.open(self.page + ".gz", "rb") as f, open(self.page, "rb") as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_skips_up_to_date_files(self):
+        self.compress()
+        self.assertEqual(self.compress(), 0)
+        with open(self.page, "a") as f:
+            f.write("<p>More</p>")
+        os.utime(self.page, ns=(0, 1))
+        self.assertEqual(self.compress(), 1)
+
+    def test_removes_orphaned_variants(self):
+        self.compress()
+        os.remove(self.page)
+        self.compress()
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from copy_static import sync_static
+from fixtures import SiteTestCase, write_file
+from manifest import Manifest, MANIFEST_NAME
+
+
+class TestSyncStatic(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+        os.mkdir(self.public)
+        self.manifest = Manifest(os.path.join(self.public, MANIFEST_NAME))
+
+    def sync(self, **kwargs):
+        log = StringIO()
+        with redirect_stdout(log):
+            copied = sync_static(self.static, self.public, self.manifest, **kwargs)
+        return sorted(os.path.relpath(dest, self.public) for _, dest in copied), log
+
+    def test_copies_then_skips_up_to_date_files(self):
+        copied, log = self.sync()
+        self.assertEqual(copied, ["images/a.png", "index.css"])
+        self.assertEqual(len(log.getvalue().splitlines()), 1)
+        self.assertEqual(self.sync()[0], [])
+
+    def test_copies_changed_file(self):
+        self.sync()
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.sync()[0], ["index.css"])
+        with open(os.path.join(self.public, "index.css")) as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_removes_stale_outputs(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.manifest.seen.clear()
+        self.sync()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+    def test_link(self):
+        self.sync(link=True)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.static, "index.css"),
+                os.path.join(self.public, "index.css"),
+            )
+        )
+        # Replacing a linked output must not write through to the source
+        write_file(os.path.join(self.static, "images", "a.png"), "new png")
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 0))
+        self.sync()
+        with open(os.path.join(self.static, "index.css")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import socket
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from build_client import request
+from daemon import BuildDaemon
+from fixtures import SiteTestCase, write_file
+from manifest import Manifest, MANIFEST_NAME
+
+
+class TestBuildDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.tmp.name, "build.sock")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        os.mkdir(self.public)
+        self.daemon = BuildDaemon(
+            self.content,
+            self.static,
+            self.template,
+            self.public,
+            Manifest(os.path.join(self.public, MANIFEST_NAME)),
+        )
+        self.daemon.listen(self.socket_path)
+        self.output = StringIO()
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+
+    def serve(self):
+        with redirect_stdout(self.output):
+            self.daemon.serve_forever()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            request(self.socket_path, "stop")
+            self.thread.join()
+
+    def test_build_rebuilds_changed_page_and_streams_log(self):
+        write_file(os.path.join(self.content, "post.md"), "# Post\n")
+        lines = []
+        reply = request(self.socket_path, "build", lines.append)
+        self.assertEqual(reply["outputs"], 1)
+        self.assertTrue(any("post.md" in line for line in lines))
+        with open(os.path.join(self.public, "post.html")) as f:
+            self.assertEqual(f.read(), "<title>Post</title><div><h1>Post</h1></div>")
+
+    def test_build_without_changes(self):
+        self.assertEqual(request(self.socket_path, "build")["outputs"], 0)
+        self.assertEqual(request(self.socket_path, "status")["builds"], 1)
+
+    def test_stop_removes_socket(self):
+        self.assertEqual(request(self.socket_path, "stop"), {"stopping": True})
+        self.thread.join()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_unknown_command(self):
+        self.assertIn("error", request(self.socket_path, "deploy"))
+
+    def test_refuses_socket_of_running_daemon(self):
+        other = BuildDaemon(
+            self.content, self.static, self.template, self.public, Manifest("x")
+        )
+        try:
+            with self.assertRaises(RuntimeError):
+                other.listen(self.socket_path)
+        finally:
+            other.tracker.close()
+
+    def test_replaces_stale_socket(self):
+        request(self.socket_path, "stop")
+        self.thread.join()
+        # A socket file nobody listens on, as left by a killed daemon
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        self.thread = threading.Thread(target=self.serve)
+        self.daemon = BuildDaemon(
+            self.content, self.static, self.template, self.public, Manifest("x")
+        )
+        self.daemon.listen(self.socket_path)
+        self.thread.start()
+        self.assertEqual(request(self.socket_path, "build")["outputs"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
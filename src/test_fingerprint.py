@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from copy_static import sync_static
+from fingerprint import AssetMap, fingerprinted_name, write_asset_manifest
+from generate_page import generate_pages_recursive, write_page
+from manifest import Manifest, MANIFEST_NAME
+from site_index import SiteIndex, SITE_INDEX_NAME
+
+
+class TestAssetMap(unittest.TestCase):
+    def setUp(self):
+        self.assets = AssetMap(
+            "/public",
+            {
+                "/index.css": "/index.0123456789.css",
+                "/images/a.png": "/images/a.abcdef0123.png",
+            },
+        )
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(
+            fingerprinted_name("a.png", "abcdef0123456"), "a.abcdef0123.png"
+        )
+
+    def test_rewrite_html(self):
+        html = (
+            '<link href="/index.css?v=1"><img src="../images/a.png" alt="">'
+            '<a href="/other">x</a><img src="https://cdn.example.com/images/a.png">'
+        )
+        self.assertEqual(
+            self.assets.rewrite_html(html, self.assets.page_dir("/public/blog/x.html")),
+            '<link href="/index.0123456789.css?v=1">'
+            '<img src="/images/a.abcdef0123.png" alt="">'
+            '<a href="/other">x</a><img src="https://cdn.example.com/images/a.png">',
+        )
+
+    def test_rewrite_template_leaves_relative_urls(self):
+        html = '<link href="/index.css"><img src="images/a.png">'
+        self.assertEqual(
+            self.assets.rewrite_html(html),
+            '<link href="/index.0123456789.css"><img src="images/a.png">',
+        )
+
+    def test_references_assets(self):
+        self.assertFalse(
+            self.assets.references_assets(["/", "https://a.b/c", "#top"])
+        )
+        self.assertTrue(self.assets.references_assets(["/images/a.png#x"]))
+        self.assertTrue(self.assets.references_assets(["images/a.png"]))
+
+
+class TestFingerprintBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.state = os.path.join(root, "state")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.mkdir(self.state)
+        with open(os.path.join(self.static, "index.css"), "w") as f:
+            f.write("body {}")
+        with open(os.path.join(self.static, "images", "a.png"), "wb") as f:
+            f.write(b"png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, link=False):
+        urls = {}
+        with redirect_stdout(StringIO()):
+            sync_static(self.static, self.public, link=link, assets=urls)
+        return write_asset_manifest(self.public, urls, self.state)
+
+    def test_copies_and_manifest(self):
+        assets = self.sync()
+        css = assets.urls["/index.css"]
+        self.assertRegex(css, r"^/index\.[0-9a-f]{10}\.css$")
+        with open(os.path.join(self.public, css[1:])) as f:
+            self.assertEqual(f.read(), "body {}")
+        # Originals stay for references the build doesn't rewrite
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+        with open(os.path.join(self.state, "asset-manifest.json")) as f:
+            self.assertEqual(json.load(f), assets.urls)
+
+        with open(os.path.join(self.static, "index.css"), "w") as f:
+            f.write("body { margin: 0 }")
+        new_css = self.sync().urls["/index.css"]
+        self.assertNotEqual(new_css, css)
+        self.assertFalse(os.path.exists(os.path.join(self.public, css[1:])))
+
+    def test_fingerprinted_copy_is_independent_of_linked_source(self):
+        assets = self.sync(link=True)
+        source = os.path.join(self.static, "index.css")
+        css = os.path.join(self.public, assets.urls["/index.css"][1:])
+        output = os.path.join(self.public, "index.css")
+        self.assertTrue(os.path.samefile(source, output))
+        self.assertFalse(os.path.samefile(source, css))
+        # An in-place edit reaches the linked output but not the immutable copy
+        with open(source, "r+") as f:
+            f.write("html")
+        with open(css) as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_pages_use_fingerprinted_urls(self):
+        assets = self.sync()
+        source = os.path.join(self.tmp.name, "page.md")
+        template = os.path.join(self.tmp.name, "template.html")
+        dest = os.path.join(self.public, "page.html")
+        with open(source, "w") as f:
+            f.write("# Title\n\n![pic](/images/a.png)\n")
+        with open(template, "w") as f:
+            f.write('<link href="/index.css">{{ Content }}')
+        write_page(source, template, dest, assets=assets)
+        with open(dest) as f:
+            page = f.read()
+        self.assertIn(f'href="{assets.urls["/index.css"]}"', page)
+        self.assertIn(f'src="{assets.urls["/images/a.png"]}"', page)
+
+    def test_asset_change_rebuilds_only_pages_using_it(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(os.path.join(content, "sub"))
+        with open(os.path.join(content, "index.md"), "w") as f:
+            f.write("# Home\n\nNo assets\n")
+        with open(os.path.join(content, "sub", "pic.md"), "w") as f:
+            f.write("# Pic\n\n![pic](../images/a.png)\n")
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        manifest = Manifest(os.path.join(self.public, MANIFEST_NAME))
+        site_index = SiteIndex(os.path.join(self.public, SITE_INDEX_NAME))
+
+        def build():
+            log = StringIO()
+            urls = {}
+            with redirect_stdout(log):
+                sync_static(self.static, self.public, manifest, assets=urls)
+                assets = write_asset_manifest(self.public, urls, self.state)
+                generate_pages_recursive(
+                    content,
+                    template,
+                    self.public,
+                    manifest,
+                    site_index=site_index,
+                    assets=assets,
+                )
+            return log.getvalue().count("Generating page")
+
+        self.assertEqual(build(), 2)
+        self.assertEqual(build(), 0)
+        with open(os.path.join(self.static, "images", "a.png"), "wb") as f:
+            f.write(b"new png")
+        self.assertEqual(build(), 1)
+        with open(os.path.join(self.static, "index.css"), "w") as f:
+            f.write("body { margin: 0 }")
+        self.assertEqual(build(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase, read_file, write_file
+from generate_page import (
+    collect_pages,
+    generate_pages_parallel,
+    generate_pages_recursive,
+    write_page,
+    write_page_streaming,
+)
+
+
+class TestGeneratePagesParallel(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("index", "a/index", "a/b/index", "c/index"):
+            write_file(
+                os.path.join(self.content, name + ".md"),
+                f"# Page {name}\n\nSome **bold** text\n",
+            )
+
+    def test_collect_pages_creates_directories(self):
+        public = os.path.join(self.tmp.name, "public")
+        os.mkdir(public)
+        pages = collect_pages(self.content, public)
+        self.assertEqual(
+            [os.path.relpath(dest, public) for _, dest in pages],
+            ["a/b/index.html", "a/index.html", "c/index.html", "index.html"],
+        )
+        self.assertTrue(os.path.isdir(os.path.join(public, "a", "b")))
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        os.mkdir(serial)
+        os.mkdir(parallel)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, serial)
+            generate_pages_parallel(self.content, self.template, parallel, 2)
+        for _, dest in collect_pages(self.content, serial):
+            other = os.path.join(parallel, os.path.relpath(dest, serial))
+            self.assertEqual(read_file(dest), read_file(other))
+
+    def test_parallel_reports_errors_per_file(self):
+        bad_page = os.path.join(self.content, "c", "index.md")
+        write_file(bad_page, "# Bad\n\n**unclosed\n")
+        public = os.path.join(self.tmp.name, "public")
+        os.mkdir(public)
+        log = StringIO()
+        with redirect_stdout(log):
+            with self.assertRaises(RuntimeError):
+                generate_pages_parallel(self.content, self.template, public, 2)
+        self.assertIn(f"Error generating page {bad_page}", log.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(public, "a", "index.html")))
+
+
+class TestWritePageStreaming(unittest.TestCase):
+    def test_matches_write_page(self):
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        source = os.path.join(repo_root, "content", "majesty", "index.md")
+        template = os.path.join(repo_root, "template.html")
+        with tempfile.TemporaryDirectory() as tmp:
+            whole = os.path.join(tmp, "whole.html")
+            streamed = os.path.join(tmp, "streamed.html")
+            write_page(source, template, whole)
+            write_page_streaming(source, template, streamed)
+            self.assertEqual(read_file(streamed), read_file(whole))
+
+    def test_title_matches_write_page(self):
+        sources = {
+            "h2 first": "## Intro\n\nText\n\n# Real Title\n",
+            "no trailing newline": "Text\n\n# Last",
+            "multi-line h1": "# First line\nsecond line\n\nText\n",
+            "h1 in code": "```\n# Not a title\n```\n\n# Title\n",
+            "blank line in code": "# Real\n\ntext\n\n```\ncode\n\nmore\n```",
+            "trailing blank lines": "# Title\n\nText\n\n\n\n",
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            write_file(template, "<title>{{ Title }}</title>{{ Content }}")
+            for name, markdown in sources.items():
+                with self.subTest(name):
+                    source = os.path.join(tmp, "page.md")
+                    whole = os.path.join(tmp, "whole.html")
+                    streamed = os.path.join(tmp, "streamed.html")
+                    write_file(source, markdown)
+                    metadata = write_page(source, template, whole)
+                    streamed_metadata = write_page_streaming(
+                        source, template, streamed
+                    )
+                    self.assertEqual(read_file(streamed), read_file(whole))
+                    self.assertEqual(streamed_metadata, metadata)
+
+    def test_front_matter(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "page.md")
+            template = os.path.join(tmp, "template.html")
+            dest = os.path.join(tmp, "page.html")
+            write_file(
+                source, "---\ntitle: Post\ndate: today\n---\n# Heading\n\nText\n"
+            )
+            write_file(template, "{{ Title }}|{{ Date }}|{{ Content }}")
+            write_page_streaming(source, template, dest)
+            self.assertEqual(
+                read_file(dest), "Post|today|<div><h1>Heading</h1><p>Text</p></div>"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,15 +6,24 @@ from helpers import (
     split_nodes_link,
     code_to_html_node,
     heading_to_html_node,
+    render_markdown,
     markdown_to_html_node,
+    block_memo_stats,
+    render_block,
     paragraph_to_html_node,
     ordered_list_to_html_node,
     unordered_list_to_html_node,
     text_to_textnodes,
+    tokenize_inline,
     extract_markdown_images,
     extract_markdown_links,
     block_to_block_type,
+    block_to_html_node,
+    classify_block,
     markdown_to_blocks,
+    split_front_matter,
+    split_front_matter_lines,
+    iter_markdown_blocks,
 )
 from constants import (
     BLOCK_TYPE_CODE,
@@ -39,6 +48,23 @@ from htmlnode import ParentNode, LeafNode
 from textnode import TextNode
 
 
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_split_front_matter(self):
+        markdown = "---\nTitle: A post\ndate: 2024-01-01\n---\n# Heading\n"
+        self.assertEqual(
+            split_front_matter(markdown),
+            ({"title": "A post", "date": "2024-01-01"}, "# Heading\n"),
+        )
+
+    def test_split_front_matter_none(self):
+        markdown = "# Heading\n\n---\n"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_split_front_matter_unterminated(self):
+        markdown = "---\ntitle: A post\n# Heading\n"
+        self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
         markdown_string = """
@@ -59,6 +85,66 @@ class TestMarkdownToBlocks(unittest.TestCase):
         )
 
 
+class TestIterMarkdownBlocks(unittest.TestCase):
+    def test_matches_markdown_to_blocks(self):
+        markdown_string = """
+            # This is a heading
+
+            This is a paragraph of text. It has some **bold** and *italic* words inside of it.
+
+            * This is a list item
+            * This is another list item
+        """
+        self.assertEqual(
+            list(iter_markdown_blocks(markdown_string.splitlines(keepends=True))),
+            markdown_to_blocks(markdown_string),
+        )
+
+    def test_code_fence_with_blank_lines(self):
+        lines = [
+            "# Heading\n",
+            "\n",
+            "```\n",
+            "a = 1\n",
+            "\n",
+            "b = 2\n",
+            "```\n",
+            "\n",
+            "After\n",
+        ]
+        self.assertEqual(
+            list(iter_markdown_blocks(lines)),
+            ["# Heading", "```\na = 1\n\nb = 2\n```", "After"],
+        )
+
+    def test_code_fence_matches_markdown_to_blocks(self):
+        markdown = "# Real\n\ntext\n\n```\ncode\n\nmore\n```\n\n\n\nAfter\n\n"
+        self.assertEqual(
+            markdown_to_blocks(markdown),
+            ["# Real", "text", "```\ncode\n\nmore\n```", "After"],
+        )
+        self.assertEqual(
+            list(iter_markdown_blocks(markdown.splitlines(keepends=True))),
+            markdown_to_blocks(markdown),
+        )
+
+    def test_single_line_fence(self):
+        lines = ["```code```\n", "\n", "After\n"]
+        self.assertEqual(list(iter_markdown_blocks(lines)), ["```code```", "After"])
+
+    def test_split_front_matter_lines(self):
+        lines = ["---\n", "title: Post\n", "---\n", "# Heading\n"]
+        front_matter, rest = split_front_matter_lines(lines)
+        self.assertEqual(front_matter, {"title": "Post"})
+        self.assertEqual(list(rest), ["# Heading\n"])
+
+    def test_split_front_matter_lines_none(self):
+        lines = ["# Heading\n", "\n", "Text\n"]
+        front_matter, rest = split_front_matter_lines(lines)
+        self.assertEqual(front_matter, {})
+        self.assertEqual(list(rest), lines)
+
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_block_to_block_type_heading(self):
         block = "# This is a heading block"
@@ -88,6 +174,30 @@ class TestBlockToBlockType(unittest.TestCase):
         block = "1. This is \n3. an ordered list\n3. that is incorrectly formatted"
         self.assertEqual(block_to_block_type(block), BLOCK_TYPE_PARAGRAPH)
 
+    def test_block_to_block_type_heading_marker_mid_block(self):
+        block = "Written in C# mostly\n# not a heading either"
+        self.assertEqual(block_to_block_type(block), BLOCK_TYPE_PARAGRAPH)
+
+    def test_classify_block_strips_markers(self):
+        self.assertEqual(
+            classify_block("> quoted\n>  text"), (BLOCK_TYPE_QUOTE, ["quoted", "text"])
+        )
+        self.assertEqual(
+            classify_block("- one\n  * two"),
+            (BLOCK_TYPE_UNORDERED_LIST, ["one", "two"]),
+        )
+        self.assertEqual(
+            classify_block("- one\ntwo"), (BLOCK_TYPE_PARAGRAPH, ["- one", "two"])
+        )
+        self.assertEqual(classify_block("## Title"), (BLOCK_TYPE_HEADING, None))
+
+    def test_classify_block_long_ordered_list(self):
+        block = "\n".join(f"{n}. item {n}" for n in range(1, 12))
+        block_type, lines = classify_block(block)
+        self.assertEqual(block_type, BLOCK_TYPE_ORDERED_LIST)
+        self.assertEqual(lines[10], "item 11")
+        self.assertIn("<li>item 10</li>", block_to_html_node(block).to_html())
+
 
 class TestMarkdownToHTMLNode(unittest.TestCase):
     def test_markdown_to_html_node(self):
@@ -123,6 +233,19 @@ class TestMarkdownToHTMLNode(unittest.TestCase):
         expected_node = ParentNode(TAG_TYPE_DIV, [child_node_1, child_node_2, child_node_3])
         self.assertEqual(result_node, expected_node)
 
+    def test_markdown_to_html_matches_node_tree(self):
+        markdown = "# Title\n\nSome **bold**\n\n> quoted\n\nSome **bold**"
+        self.assertEqual(
+            render_markdown(markdown)[0], markdown_to_html_node(markdown).to_html()
+        )
+
+    def test_render_block_memoises_repeated_blocks(self):
+        block = "* a block that only this test renders\n* [link](/x)"
+        hits, misses = block_memo_stats()
+        first = render_block(block)
+        self.assertIs(render_block(block), first)
+        self.assertEqual(block_memo_stats(), (hits + 1, misses + 1))
+
 
 class TestSplitNodesDelimiter(unittest.TestCase):
     def test_split_nodes_delimiter_code(self):
@@ -354,6 +477,64 @@ class TestTextToTextNodes(unittest.TestCase):
         )
 
 
+class TestTokenizeInline(unittest.TestCase):
+    # Inputs from the cases above; the tokenizer must agree with the
+    # text_to_textnodes reference on all of them
+    reference_cases = [
+        "This is **text** with an *italic* word and a `code block` and an ![image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and a [link](https://boot.dev)",
+        "This is text with a `code block` word",
+        "This is text with a *bold* word",
+        "This is text with a **italic** word",
+        "This is text with an ![image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and another ![second image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/3elNhQu.png)",
+        "This is text with an ![image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png)",
+        "This is text with an ![image](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and some additional text",
+        "This is text with a [link](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and another [second link](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/3elNhQu.png)",
+        "This is text with a [link](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png)",
+        "This is text with a [link](https://storage.googleapis.com/qvault-webapp-dynamic-assets/course_assets/zjjcJKZ.png) and some additional text",
+        "This is a paragraph of text. It has some **bold** and *italic* words inside of it.",
+        "This is just a regular paragraph with no nested elements.",
+        "This is a heading",
+        "[Back Home](/)",
+        "[first](/a)[second](/b) and ![alt](/c.png)",
+        "**bold**[link](/a) text",
+        "![x] (y) [z](w)",
+        "a [b ![c](d) e",
+        "",
+    ]
+
+    def test_matches_reference(self):
+        for text in self.reference_cases:
+            with self.subTest(text=text):
+                self.assertEqual(tokenize_inline(text), text_to_textnodes(text))
+
+    def test_every_span_is_styled(self):
+        self.assertEqual(
+            tokenize_inline("the `Valar` and `Maiar`"),
+            [
+                TextNode("the ", TextNode.text_type_text),
+                TextNode("Valar", TextNode.text_type_code),
+                TextNode(" and ", TextNode.text_type_text),
+                TextNode("Maiar", TextNode.text_type_code),
+            ],
+        )
+
+    def test_code_is_literal(self):
+        self.assertEqual(
+            tokenize_inline("`*not* [a](link)`"),
+            [TextNode("*not* [a](link)", TextNode.text_type_code)],
+        )
+
+    def test_unbalanced_delimiter(self):
+        with self.assertRaises(Exception):
+            tokenize_inline("This is **unclosed")
+
+    def test_many_unclosed_brackets(self):
+        text = "[" * 50000 + " tail"
+        self.assertEqual(
+            tokenize_inline(text), [TextNode(text, TextNode.text_type_text)]
+        )
+
+
 class TestBlockToHTML(unittest.TestCase):
     # print(f"result node: {result_node}")
     # print(f"expected node: {expected_node}")
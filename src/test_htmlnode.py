@@ -139,6 +139,32 @@ class TestParentNode(unittest.TestCase):
             "<title><h1><p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p></h1></title>",
         )
 
+    def test_render_into(self):
+        parentnode = ParentNode(
+            "p",
+            [LeafNode("b", "Bold text"), LeafNode(None, "Normal text")],
+            {"class": "some_css"},
+        )
+        chunks = []
+        parentnode.render_into(chunks.append)
+        self.assertEqual(
+            chunks,
+            ['<p class="some_css">', "<b>Bold text</b>", "Normal text", "</p>"],
+        )
+        self.assertEqual("".join(chunks), parentnode.to_html())
+
+    def test_deep_tree(self):
+        node = LeafNode(None, "leaf")
+        for _ in range(200):
+            node = ParentNode("div", [node, LeafNode("i", "x")])
+        self.assertEqual(
+            node.to_html(), "<div>" * 200 + "leaf" + "<i>x</i></div>" * 200
+        )
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(LeafNode("b", "Bold text"), "__dict__"))
+        self.assertFalse(hasattr(ParentNode("p", []), "__dict__"))
+
     def test_no_tag(self):
         with self.assertRaises(ValueError):
             parentnode = ParentNode(None, LeafNode("b", "Bold text"))
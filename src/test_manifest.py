@@ -0,0 +1,80 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from copy_static import copy_static
+from fixtures import SiteTestCase, write_file
+from generate_page import generate_pages_recursive
+from manifest import Manifest, MANIFEST_NAME
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome\n")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post\n\nText\n")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        os.mkdir(self.public)
+
+    def build(self):
+        manifest = Manifest.load(os.path.join(self.public, MANIFEST_NAME))
+        log = StringIO()
+        with redirect_stdout(log):
+            copy_static(self.static, self.public, manifest)
+            generate_pages_recursive(
+                self.content, self.template, self.public, manifest
+            )
+            manifest.remove_stale()
+        manifest.save()
+        return log.getvalue()
+
+    def test_unchanged_build_does_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), "")
+
+    def test_changed_markdown_rebuilds_only_that_page(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nChanged\n")
+        log = self.build()
+        self.assertIn("index.md", log)
+        self.assertNotIn("post", log)
+        self.assertNotIn("index.css", log)
+
+    def test_changed_template_rebuilds_all_pages(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        log = self.build()
+        self.assertEqual(log.count("Generating page"), 2)
+        self.assertNotIn("Copying static file", log)
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        output = os.path.join(self.public, "post", "index.html")
+        self.assertTrue(os.path.exists(output))
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(output))
+        self.assertFalse(os.path.exists(os.path.dirname(output)))
+
+    def test_invalidated_manifest_rebuilds_and_removes_stale_outputs(self):
+        self.build()
+        output = os.path.join(self.public, "post", "index.html")
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        manifest = Manifest.load(os.path.join(self.public, MANIFEST_NAME))
+        manifest.invalidate(os.path.join(self.content, ""))
+        manifest.save()
+        log = self.build()
+        self.assertEqual(log.count("Generating page"), 1)
+        self.assertNotIn("Copying static file", log)
+        self.assertFalse(os.path.exists(output))
+
+    def test_deleted_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.css"))
+        log = self.build()
+        self.assertIn("index.css", log)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase, read_file, write_file
+from generate_page import collect_pages, generate_pages_recursive
+from manifest import Manifest, MANIFEST_NAME
+from pipeline import StageClock, _bottleneck, generate_pages_pipelined
+from site_index import SiteIndex, SITE_INDEX_NAME
+
+
+class TestGeneratePagesPipelined(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("index", "a/index", "a/b/index", "c/index"):
+            write_file(
+                os.path.join(self.content, name + ".md"),
+                f"# Page {name}\n\nSome **bold** text\n",
+            )
+        os.mkdir(self.public)
+
+    def build(self, jobs=1, **kwargs):
+        log = StringIO()
+        with redirect_stdout(log):
+            generate_pages_pipelined(
+                self.content, self.template, self.public, jobs, **kwargs
+            )
+        return log.getvalue()
+
+    def test_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        os.mkdir(serial)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursive(self.content, self.template, serial)
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                self.build(jobs, io_threads=2, queue_size=1)
+                for _, dest in collect_pages(self.content, serial):
+                    other = os.path.join(self.public, os.path.relpath(dest, serial))
+                    self.assertEqual(read_file(dest), read_file(other))
+
+    def test_reports_stage_utilization(self):
+        log = self.build()
+        self.assertRegex(
+            log,
+            r"Pipeline: 4 pages in [\d.]+s, read \d+% busy \(2 threads\), "
+            r"render \d+% busy \(1 worker\), write \d+% busy \(2 threads\): "
+            r"(no stage saturated|(CPU|I/O)-bound \(\w+\))",
+        )
+
+    def test_records_manifest_and_index_then_skips_unchanged(self):
+        manifest = Manifest(os.path.join(self.public, MANIFEST_NAME))
+        site_index = SiteIndex(os.path.join(self.public, SITE_INDEX_NAME))
+        self.build(manifest=manifest, site_index=site_index)
+        self.assertEqual(len(manifest.outputs), 4)
+        page = os.path.join(self.content, "a", "index.md")
+        self.assertEqual(site_index.pages[page]["title"], "Page a/index")
+        self.assertNotIn("Generating page", self.build(manifest=manifest))
+
+    def test_reports_errors_per_file(self):
+        bad_page = os.path.join(self.content, "c", "index.md")
+        write_file(bad_page, "# Bad\n\n**unclosed\n")
+        log = StringIO()
+        with redirect_stdout(log):
+            with self.assertRaises(RuntimeError):
+                generate_pages_pipelined(
+                    self.content, self.template, self.public, 1
+                )
+        self.assertIn(f"Error generating page {bad_page}", log.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.public, "a", "index.html")))
+
+    def test_undecodable_page_is_reported_not_hung(self):
+        bad_page = os.path.join(self.content, "c", "index.md")
+        with open(bad_page, "wb") as f:
+            f.write(b"# Bad \xff\n")
+        log = StringIO()
+        with redirect_stdout(log):
+            with self.assertRaises(RuntimeError):
+                generate_pages_pipelined(
+                    self.content, self.template, self.public, 1
+                )
+        self.assertIn(
+            f"Error generating page {bad_page}: UnicodeDecodeError", log.getvalue()
+        )
+
+
+class TestStageClock(unittest.TestCase):
+    def test_utilization_is_per_worker(self):
+        clock = StageClock("render", 4, "worker")
+        clock.add(2.0)
+        clock.add(1.0)
+        self.assertAlmostEqual(clock.utilization(1.5), 0.5)
+        self.assertEqual(clock.utilization(0), 0.0)
+
+    def test_bottleneck_needs_a_saturated_stage(self):
+        read = StageClock("read", 2, "thread")
+        render = StageClock("render", 1, "worker")
+        read.add(0.2)
+        render.add(0.06)
+        self.assertEqual(_bottleneck(1.0, [read, render]), "no stage saturated")
+        render.add(0.9)
+        self.assertEqual(_bottleneck(1.0, [read, render]), "CPU-bound (render)")
+        read.add(1.8)
+        self.assertEqual(_bottleneck(1.0, [read, render]), "I/O-bound (read)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from copy_static import sync_static
+from fixtures import SiteTestCase, write_file
+from generate_page import generate_pages_recursive
+from manifest import Manifest, MANIFEST_NAME
+from plan import plan_build
+
+
+class TestPlanBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post\n")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "logo.svg"), "<svg/>")
+
+    def test_plan_lists_every_step_without_touching_disk(self):
+        plan = plan_build(self.content, self.static, self.public)
+        self.assertEqual(
+            list(plan.directories),
+            [
+                self.public,
+                os.path.join(self.public, "post"),
+                os.path.join(self.public, "images"),
+            ],
+        )
+        self.assertEqual(
+            plan.pages,
+            [
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.public, "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "post", "index.md"),
+                    os.path.join(self.public, "post", "index.html"),
+                ),
+            ],
+        )
+        self.assertEqual(
+            [os.path.relpath(output, self.public) for _, output in plan.copies],
+            ["images/logo.svg", "index.css"],
+        )
+        self.assertEqual(len(plan), 7)
+        self.assertEqual(
+            plan.describe()[-1],
+            "Plan: 3 directories, 2 pages, 2 static files (7 steps)",
+        )
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_records_source_stats(self):
+        plan = plan_build(self.content, self.static, self.public)
+        css = os.path.join(self.static, "index.css")
+        self.assertEqual(plan.stat(css).st_size, os.stat(css).st_size)
+        self.assertEqual(len(plan.stats), 4)
+
+    def test_missing_source(self):
+        with self.assertRaises(ValueError):
+            plan_build(os.path.join(self.tmp.name, "missing"), None, self.public)
+
+    def test_executors_follow_plan(self):
+        plan = plan_build(self.content, self.static, self.public)
+        # A page added after planning isn't part of this build
+        write_file(os.path.join(self.content, "late.md"), "# Late\n")
+        plan.create_directories()
+        manifest = Manifest(os.path.join(self.public, MANIFEST_NAME))
+        with redirect_stdout(StringIO()):
+            sync_static(self.static, self.public, manifest, plan=plan)
+            generate_pages_recursive(
+                self.content, self.template, self.public, manifest, plan=plan
+            )
+        self.assertTrue(os.path.exists(os.path.join(self.public, "post", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "images", "logo.svg")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "late.html")))
+        self.assertEqual(len(manifest.outputs), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
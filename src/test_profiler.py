@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import generate_page
+from generate_page import write_page, write_page_profiled
+from profiler import PAGE_STAGES, BuildProfiler
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.markdown = os.path.join(self.tmp.name, "page.md")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.markdown, "w") as f:
+            f.write("# Title\n\nSome **bold** text\n\n- one\n- two\n")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title><body>{{ Content }}</body>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_profiled_page_matches_write_page(self):
+        plain = os.path.join(self.tmp.name, "plain.html")
+        profiled = os.path.join(self.tmp.name, "profiled.html")
+        write_page(self.markdown, self.template, plain)
+        profiler = BuildProfiler()
+        write_page_profiled(self.markdown, self.template, profiled, profiler)
+        with open(plain) as f, open(profiled) as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertEqual(
+            [event[0] for event in profiler.events],
+            [stage for stage in PAGE_STAGES if stage not in ("cache_read", "stream")],
+        )
+
+    def test_large_page_is_streamed(self):
+        plain = os.path.join(self.tmp.name, "plain.html")
+        profiled = os.path.join(self.tmp.name, "profiled.html")
+        write_page(self.markdown, self.template, plain)
+        profiler = BuildProfiler()
+        with mock.patch.object(generate_page, "STREAM_THRESHOLD_BYTES", 1):
+            write_page_profiled(self.markdown, self.template, profiled, profiler)
+        with open(plain) as f, open(profiled) as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertEqual([event[0] for event in profiler.events], ["stream"])
+
+    def test_report_and_trace(self):
+        profiler = BuildProfiler()
+        profiler.record("read", "a.md", 0.0, 0.002, 10)
+        profiler.record("write", "a.md", 0.002, 0.003, 20)
+        profiler.record("read", "b.md", 0.0, 0.001, 5)
+        profiler.record("static_copy", "x.css", 0.0, 0.5, 5)
+        self.assertEqual(
+            [path for path, _ in profiler.slowest_pages(2)], ["a.md", "b.md"]
+        )
+        self.assertEqual(profiler.stage_totals()["read"][0], 2)
+        output = StringIO()
+        with redirect_stdout(output):
+            profiler.report(1)
+        self.assertIn("a.md", output.getvalue())
+        self.assertNotIn("b.md", output.getvalue())
+
+        trace_path = os.path.join(self.tmp.name, "trace.json")
+        profiler.export_chrome_trace(trace_path)
+        with open(trace_path) as f:
+            trace = json.load(f)
+        self.assertEqual(len(trace["traceEvents"]), 4)
+        self.assertEqual(trace["traceEvents"][0]["ph"], "X")
+        self.assertAlmostEqual(trace["traceEvents"][0]["dur"], 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
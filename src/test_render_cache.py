@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from generate_page import write_page
+from render_cache import RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(os.path.join(self.tmp.name, "cache"), 1 << 20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put(self):
+        key = self.cache.key("# Title")
+        self.assertNotEqual(key, self.cache.key("# Other title"))
+        self.assertIsNone(self.cache.get(key))
+        metadata = {"title": "Title", "headings": [[1, "Title"]]}
+        self.cache.put(key, "<div><h1>Title</h1>\n</div>", metadata)
+        self.assertEqual(self.cache.get(key), ("<div><h1>Title</h1>\n</div>", metadata))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.max_bytes = 30
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 10, {})
+            # Distinct mtimes even on filesystems with coarse timestamps
+            path = self.cache._path(key)
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        # Reading an entry makes it the most recently used
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        with redirect_stdout(StringIO()):
+            self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_write_page_reuses_cached_body(self):
+        source = os.path.join(self.tmp.name, "page.md")
+        template = os.path.join(self.tmp.name, "template.html")
+        dest = os.path.join(self.tmp.name, "page.html")
+        with open(source, "w") as f:
+            f.write("# Title\n\nSome *text*\n")
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+        write_page(source, template, dest)
+        with open(dest) as f:
+            uncached = f.read()
+        write_page(source, template, dest, self.cache)
+        with open(dest) as f:
+            self.assertEqual(f.read(), uncached)
+
+        # A second build takes the body from the cache without parsing
+        key = self.cache.key("# Title\n\nSome *text*\n")
+        self.cache.put(key, "<div>cached</div>", {"title": "Title"})
+        write_page(source, template, dest, self.cache)
+        with open(dest) as f:
+            self.assertEqual(f.read(), "<title>Title</title><div>cached</div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
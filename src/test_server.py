@@ -0,0 +1,382 @@
+import functools
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from email.utils import formatdate
+from http.server import HTTPServer
+
+# server.py sits at the repository root, next to src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import (  # noqa: E402
+    IMMUTABLE_CACHE_CONTROL,
+    LIVERELOAD_PATH,
+    LIVERELOAD_SCRIPT,
+    CachingHandler,
+    CachingHTTPServer,
+    FileCache,
+    LiveReloadHandler,
+    LiveReloadHub,
+    inject_live_reload,
+)
+
+MTIME = 1_700_000_000
+
+
+class QuietCachingHandler(CachingHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def write_static(root, name, data, mtime=MTIME):
+    # Written with a fixed mtime, as the build stamps compressed variants
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class ServerTestCase(unittest.TestCase):
+    # Serves a temporary directory on a free port from a background thread
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+
+    def serve(self, handler_class, server_class=CachingHTTPServer, **server_kwargs):
+        handler = functools.partial(handler_class, directory=self.root)
+        server = server_class(("127.0.0.1", 0), handler, **server_kwargs)
+        thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        self.server = server
+        return server
+
+    def connect(self):
+        port = self.server.server_address[1]
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(connection.close)
+        return connection
+
+    def request(self, path, headers=None, method="GET", body=None):
+        connection = self.connect()
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+
+class TestCachingHandler(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        write_static(self.root, "index.html", b"<p>page</p>")
+        write_static(self.root, "index.css", b"body {}")
+        write_static(self.root, "index.css.gz", b"gzip bytes")
+        write_static(self.root, "index.css.br", b"brotli bytes")
+        write_static(self.root, "index.0123456789.css", b"body {}")
+        self.serve(QuietCachingHandler, cache_bytes=1 << 20)
+
+    def test_serves_file_with_validators(self):
+        response, body = self.request("/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b"<p>page</p>")
+        self.assertEqual(response.getheader("Content-Type"), "text/html")
+        self.assertEqual(response.getheader("ETag"), f'"{MTIME * 10**9:x}-b"')
+        self.assertEqual(
+            response.getheader("Last-Modified"), formatdate(MTIME, usegmt=True)
+        )
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertIsNone(response.getheader("Vary"))
+        self.assertIsNone(response.getheader("Cache-Control"))
+
+    def test_missing_file(self):
+        response, _ = self.request("/missing.html")
+        self.assertEqual(response.status, 404)
+
+    def test_precompressed_variants(self):
+        cases = {
+            "br, gzip": ("br", b"brotli bytes"),
+            "gzip": ("gzip", b"gzip bytes"),
+            "br;q=0, gzip": ("gzip", b"gzip bytes"),
+            "gzip; q=0.0, deflate": (None, b"body {}"),
+            "": (None, b"body {}"),
+        }
+        for accept_encoding, (encoding, expected) in cases.items():
+            with self.subTest(accept_encoding):
+                response, body = self.request(
+                    "/index.css", {"Accept-Encoding": accept_encoding}
+                )
+                self.assertEqual(response.status, 200)
+                self.assertEqual(body, expected)
+                self.assertEqual(response.getheader("Content-Encoding"), encoding)
+                self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+                self.assertEqual(response.getheader("Content-Type"), "text/css")
+
+    def test_stale_variant_is_ignored(self):
+        write_static(self.root, "index.css.gz", b"old gzip", mtime=MTIME - 60)
+        response, body = self.request("/index.css", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"body {}")
+
+    def test_fingerprinted_files_are_immutable(self):
+        response, _ = self.request("/index.0123456789.css")
+        self.assertEqual(response.getheader("Cache-Control"), IMMUTABLE_CACHE_CONTROL)
+        response, _ = self.request("/index.css")
+        self.assertIsNone(response.getheader("Cache-Control"))
+
+    def test_if_none_match(self):
+        response, _ = self.request("/index.css")
+        etag = response.getheader("ETag")
+        for if_none_match in (etag, f'"other", W/{etag}', "*"):
+            with self.subTest(if_none_match):
+                response, body = self.request(
+                    "/index.css", {"If-None-Match": if_none_match}
+                )
+                self.assertEqual(response.status, 304)
+                self.assertEqual(body, b"")
+                self.assertEqual(response.getheader("ETag"), etag)
+        response, _ = self.request("/index.css", {"If-None-Match": '"other"'})
+        self.assertEqual(response.status, 200)
+
+    def test_if_modified_since(self):
+        cases = {
+            formatdate(MTIME, usegmt=True): 304,
+            formatdate(MTIME + 60, usegmt=True): 304,
+            formatdate(MTIME - 60, usegmt=True): 200,
+            "not a date": 200,
+        }
+        for if_modified_since, status in cases.items():
+            with self.subTest(if_modified_since):
+                response, _ = self.request(
+                    "/index.html", {"If-Modified-Since": if_modified_since}
+                )
+                self.assertEqual(response.status, status)
+        # If-None-Match takes precedence
+        response, _ = self.request(
+            "/index.html",
+            {
+                "If-None-Match": '"other"',
+                "If-Modified-Since": formatdate(MTIME, usegmt=True),
+            },
+        )
+        self.assertEqual(response.status, 200)
+
+    def test_not_modified_keeps_cache_control(self):
+        headers = {"Accept-Encoding": "gzip"}
+        response, _ = self.request("/index.0123456789.css", headers)
+        headers["If-None-Match"] = response.getheader("ETag")
+        response, _ = self.request("/index.0123456789.css", headers)
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.getheader("Cache-Control"), IMMUTABLE_CACHE_CONTROL)
+
+    def test_modified_file_is_served_fresh(self):
+        self.request("/index.html")
+        write_static(self.root, "index.html", b"<p>new page</p>", mtime=MTIME + 1)
+        response, body = self.request("/index.html")
+        self.assertEqual(body, b"<p>new page</p>")
+
+    def test_plain_server_without_file_cache(self):
+        # The default single-threaded mode: no FileCache, same headers
+        self.serve(QuietCachingHandler, server_class=HTTPServer)
+        response, body = self.request("/index.css", {"Accept-Encoding": "gzip"})
+        self.assertEqual(body, b"gzip bytes")
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertIsNotNone(response.getheader("ETag"))
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def get(self, cache, name):
+        path = os.path.join(self.tmp.name, name)
+        return cache.get(path, os.stat(path))
+
+    def test_evicts_least_recently_used(self):
+        for name in ("a", "b", "c"):
+            write_static(self.tmp.name, name, name.encode() * 40)
+        cache = FileCache(100)
+        self.get(cache, "a")
+        self.get(cache, "b")
+        self.get(cache, "a")
+        self.assertEqual(self.get(cache, "c"), b"c" * 40)
+        self.assertEqual(cache.size, 80)
+        self.assertEqual(
+            [os.path.basename(path) for path in cache._entries], ["a", "c"]
+        )
+
+    def test_reloads_changed_file(self):
+        write_static(self.tmp.name, "a", b"old")
+        cache = FileCache(100)
+        self.assertEqual(self.get(cache, "a"), b"old")
+        write_static(self.tmp.name, "a", b"newer", mtime=MTIME + 1)
+        self.assertEqual(self.get(cache, "a"), b"newer")
+        self.assertEqual(cache.size, 5)
+
+
+class TestCachingHTTPServer(ServerTestCase):
+    def test_cache_stays_within_bound(self):
+        for index in range(20):
+            write_static(self.root, f"{index}.txt", b"x" * 90)
+        write_static(self.root, "large.txt", b"x" * 200)
+        server = self.serve(QuietCachingHandler, cache_bytes=800)
+        for index in range(20):
+            response, body = self.request(f"/{index}.txt")
+            self.assertEqual(body, b"x" * 90)
+            self.assertLessEqual(server.file_cache.size, 800)
+        # Larger than max_file_bytes: streamed from disk, never cached
+        response, body = self.request("/large.txt")
+        self.assertEqual(body, b"x" * 200)
+        large = os.path.join(self.root, "large.txt")
+        self.assertNotIn(large, server.file_cache._entries)
+
+    def test_bounded_worker_pool(self):
+        write_static(self.root, "index.html", b"<p>page</p>")
+        threads = set()
+
+        class RecordingHandler(QuietCachingHandler):
+            def send_head(self):
+                threads.add(threading.get_ident())
+                time.sleep(0.02)
+                return super().send_head()
+
+        self.serve(RecordingHandler, workers=2)
+        statuses = []
+
+        def fetch():
+            response, _ = self.request("/index.html")
+            statuses.append(response.status)
+
+        clients = [threading.Thread(target=fetch) for _ in range(8)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        self.assertEqual(statuses, [200] * 8)
+        self.assertLessEqual(len(threads), 2)
+
+
+class RecordingHub(LiveReloadHub):
+    # Lets tests wait until an event stream is subscribed before posting
+    def __init__(self):
+        super().__init__()
+        self.subscribed = threading.Semaphore(0)
+
+    def subscribe(self):
+        client = super().subscribe()
+        self.subscribed.release()
+        return client
+
+
+class TestLiveReloadHandler(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        # Short keepalives so streams notice closed connections quickly
+        patcher = mock.patch("server.KEEPALIVE_SECONDS", 0.02)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        hub = self.hub = RecordingHub()
+
+        class Handler(LiveReloadHandler):
+            def log_message(self, format, *args):
+                pass
+
+        Handler.hub = hub
+        self.serve(Handler)
+
+    def open_stream(self):
+        connection = self.connect()
+        connection.request("GET", LIVERELOAD_PATH)
+        response = connection.getresponse()
+        self.assertTrue(self.hub.subscribed.acquire(timeout=5))
+        return response
+
+    def next_event(self, response):
+        # The data line of the next event, skipping keepalive comments
+        while True:
+            line = response.readline()
+            self.assertTrue(line, "event stream closed")
+            if line.startswith(b"data: "):
+                return line.rstrip(b"\n")
+
+    def post(self, body):
+        return self.request(LIVERELOAD_PATH, method="POST", body=body)
+
+    def test_event_stream_headers(self):
+        response = self.open_stream()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+        self.assertEqual(response.readline(), b": keepalive\n")
+
+    def test_post_broadcasts_to_every_client(self):
+        streams = [self.open_stream(), self.open_stream()]
+        response, _ = self.post(b'["/index.html", "/caf\\u00e9/index.html"]')
+        self.assertEqual(response.status, 204)
+        for stream in streams:
+            self.assertEqual(
+                self.next_event(stream),
+                b'data: ["/index.html", "/caf\\u00e9/index.html"]',
+            )
+        response, _ = self.post(b'["/about/index.html"]')
+        for stream in streams:
+            self.assertEqual(self.next_event(stream), b'data: ["/about/index.html"]')
+
+    def test_closed_stream_is_unsubscribed(self):
+        self.open_stream().close()
+        deadline = time.monotonic() + 5
+        while self.hub._clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.hub._clients, set())
+
+    def test_post_errors(self):
+        response, _ = self.post(b"not json")
+        self.assertEqual(response.status, 400)
+        response, _ = self.request("/elsewhere", method="POST", body=b"[]")
+        self.assertEqual(response.status, 404)
+
+    def test_pages_get_reload_script(self):
+        write_static(self.root, "index.html", b"<html><body><p>x</p></body></html>")
+        write_static(self.root, "index.html.gz", b"gzip bytes")
+        write_static(self.root, "index.css", b"body {}")
+        response, body = self.request("/", {"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            body, b"<html><body><p>x</p>" + LIVERELOAD_SCRIPT + b"</body></html>"
+        )
+        self.assertEqual(response.getheader("Content-Length"), str(len(body)))
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+        response, body = self.request("/index.css")
+        self.assertEqual(body, b"body {}")
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+
+
+class TestInjectLiveReload(unittest.TestCase):
+    def test_before_last_closing_body(self):
+        html = b"<BODY><p>x</p></BODY>"
+        self.assertEqual(
+            inject_live_reload(html), b"<BODY><p>x</p>" + LIVERELOAD_SCRIPT + b"</BODY>"
+        )
+
+    def test_appended_without_body(self):
+        html = b"<p>x</p>"
+        self.assertEqual(inject_live_reload(html), html + LIVERELOAD_SCRIPT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import argparse
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from copy_static import sync_static
+from fixtures import SiteTestCase, read_file, write_file
+from generate_page import generate_pages_recursive
+from manifest import Manifest, MANIFEST_NAME
+from plan import plan_build
+from shards import merge_shards, parse_shard, shard_dir, shard_of, shard_plan
+from site_index import SiteIndex, SITE_INDEX_NAME
+
+
+class TestShardAssignment(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "2", "a/b"):
+            with self.subTest(value=value):
+                with self.assertRaises(argparse.ArgumentTypeError):
+                    parse_shard(value)
+
+    def test_shard_of_ignores_content_location(self):
+        self.assertEqual(
+            shard_of("/a/content/blog/post.md", "/a/content", 8),
+            shard_of("/b/site/content/blog/post.md", "/b/site/content", 8),
+        )
+
+    def test_shards_partition_the_pages(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            static = os.path.join(root, "static")
+            for number in range(20):
+                write_file(os.path.join(content, f"p{number}.md"), "# P\n")
+            write_file(os.path.join(static, "index.css"), "body {}")
+            plan = plan_build(content, static, os.path.join(root, "public"))
+            shards = [shard_plan(plan, content, index, 3) for index in (1, 2, 3)]
+        self.assertEqual(
+            sorted(page for shard in shards for page in shard.pages), plan.pages
+        )
+        self.assertEqual([len(shard.copies) for shard in shards], [1, 0, 0])
+
+
+class TestMergeShards(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("index", "a/index", "a/b/index", "c/index", "d", "e"):
+            write_file(os.path.join(self.content, name + ".md"), f"# {name}\n")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def build_shard(self, index, count):
+        root = shard_dir(self.public, index, count)
+        os.mkdir(root)
+        plan = plan_build(self.content, self.static, root)
+        plan = shard_plan(plan, self.content, index, count)
+        plan.create_directories()
+        manifest = Manifest(os.path.join(root, MANIFEST_NAME))
+        site_index = SiteIndex(os.path.join(root, SITE_INDEX_NAME))
+        with redirect_stdout(StringIO()):
+            sync_static(self.static, root, manifest, plan=plan)
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                root,
+                manifest,
+                site_index=site_index,
+                plan=plan,
+            )
+        manifest.save()
+        site_index.save()
+
+    def merge(self, count):
+        with redirect_stdout(StringIO()):
+            return merge_shards(self.public, count, self.state)
+
+    def test_merge_combines_outputs_and_indexes(self):
+        for index in (1, 2, 3):
+            self.build_shard(index, 3)
+        manifest, site_index = self.merge(3)
+        self.assertEqual(len(manifest.outputs), 7)
+        self.assertEqual(len(site_index.pages), 6)
+        page = os.path.join(self.content, "a", "b", "index.md")
+        self.assertEqual(
+            site_index.pages[page]["output"],
+            os.path.join(self.public, "a", "b", "index.html"),
+        )
+        self.assertEqual(
+            read_file(os.path.join(self.public, "a", "b", "index.html")),
+            "<title>a/b/index</title><div><h1>a/b/index</h1></div>",
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+        # Later incremental builds continue from the merged state, which is
+        # kept out of the served tree
+        loaded = Manifest.load(os.path.join(self.state, MANIFEST_NAME))
+        self.assertEqual(loaded.outputs, manifest.outputs)
+        for name in (MANIFEST_NAME, SITE_INDEX_NAME):
+            self.assertFalse(os.path.exists(os.path.join(self.public, name)))
+
+    def test_missing_shard(self):
+        self.build_shard(1, 2)
+        with self.assertRaises(ValueError):
+            self.merge(2)
+
+    def test_dry_run_merge_leaves_public_untouched(self):
+        self.build_shard(1, 2)
+        self.build_shard(2, 2)
+        write_file(os.path.join(self.public, "old.html"), "")
+        log = StringIO()
+        with redirect_stdout(log):
+            self.assertIsNone(
+                merge_shards(self.public, 2, self.state, dry_run=True)
+            )
+        self.assertIn(
+            f"-> {os.path.join(self.public, 'index.css')}", log.getvalue()
+        )
+        self.assertIn("Merge plan: 2 shards", log.getvalue())
+        self.assertEqual(os.listdir(self.public), ["old.html"])
+
+    def test_conflicting_shards_leave_public_untouched(self):
+        self.build_shard(1, 2)
+        self.build_shard(2, 2)
+        # Shard 2 also claims a file shard 1 built
+        write_file(os.path.join(shard_dir(self.public, 2, 2), "index.css"), "")
+        write_file(os.path.join(self.public, "old.html"), "")
+        log = StringIO()
+        with redirect_stdout(log):
+            with self.assertRaises(RuntimeError):
+                merge_shards(self.public, 2, self.state)
+        self.assertIn("Conflict: index.css built by shards 1 and 2", log.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.public, "old.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase, write_file
+from generate_page import (
+    generate_pages_parallel,
+    generate_pages_recursive,
+    write_page,
+    write_page_streaming,
+)
+from manifest import Manifest
+from site_index import SiteIndex
+
+
+PAGE = """# Page title
+
+Some text with [a link](/other) and **bold** words.
+
+## A *styled* section
+
+* [Home](/)
+* ![image](/img.png)
+
+# Second h1
+"""
+
+
+class TestSiteIndex(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "index.md"), PAGE)
+        write_file(
+            os.path.join(self.content, "blog", "post.md"),
+            "---\ntitle: From front-matter\n---\n# Post\n\nOne two three\n",
+        )
+
+    def build(self, name, jobs=1):
+        public = os.path.join(self.tmp.name, name)
+        os.makedirs(public, exist_ok=True)
+        manifest = Manifest(os.path.join(public, ".manifest.json"))
+        site_index = SiteIndex(os.path.join(public, ".site-index.json"))
+        with redirect_stdout(StringIO()):
+            if jobs > 1:
+                generate_pages_parallel(
+                    self.content,
+                    self.template,
+                    public,
+                    jobs,
+                    manifest,
+                    site_index=site_index,
+                )
+            else:
+                generate_pages_recursive(
+                    self.content,
+                    self.template,
+                    public,
+                    manifest,
+                    site_index=site_index,
+                )
+        return manifest, site_index
+
+    def test_collects_page_metadata(self):
+        manifest, site_index = self.build("public")
+        index_md = os.path.join(self.content, "index.md")
+        entry = site_index.pages[index_md]
+        self.assertEqual(entry["title"], "Page title")
+        self.assertEqual(
+            entry["headings"],
+            [[1, "Page title"], [2, "A styled section"], [1, "Second h1"]],
+        )
+        self.assertEqual(entry["links"], ["/other", "/"])
+        self.assertEqual(entry["images"], ["/img.png"])
+        self.assertEqual(entry["words"], 16)
+        self.assertEqual(entry["hash"], manifest.hash(index_md))
+        post = site_index.pages[os.path.join(self.content, "blog", "post.md")]
+        self.assertEqual(post["title"], "From front-matter")
+
+    def test_parallel_matches_serial(self):
+        _, serial = self.build("serial")
+        _, parallel = self.build("parallel", jobs=2)
+        self.assertEqual(set(serial.pages), set(parallel.pages))
+        for source, entry in serial.pages.items():
+            other = parallel.pages[source]
+            self.assertEqual(
+                os.path.basename(entry["output"]), os.path.basename(other["output"])
+            )
+            self.assertEqual({**entry, "output": ""}, {**other, "output": ""})
+
+    def test_save_load_and_prune(self):
+        _, site_index = self.build("public")
+        site_index.save()
+        loaded = SiteIndex.load(site_index.path)
+        self.assertEqual(loaded.pages, site_index.pages)
+        loaded.prune([os.path.join(self.content, "index.md")])
+        self.assertEqual(list(loaded.pages), [os.path.join(self.content, "index.md")])
+
+    def test_streaming_metadata_matches_write_page(self):
+        source = os.path.join(self.content, "index.md")
+        whole = write_page(source, self.template, os.path.join(self.tmp.name, "a.html"))
+        streamed = write_page_streaming(
+            source, self.template, os.path.join(self.tmp.name, "b.html")
+        )
+        self.assertEqual(whole, streamed)
+
+
+if __name__ == "__main__":
+    unittest.main()
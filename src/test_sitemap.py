@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import sitemap
+from manifest import Manifest, MANIFEST_NAME
+from site_index import SiteIndex, SITE_INDEX_NAME
+from sitemap import SITEMAP_STATE_NAME, page_url, write_feed, write_sitemap
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+
+class TestSitemap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.tmp.name, "public")
+        self.state = os.path.join(self.tmp.name, "state")
+        os.mkdir(self.public)
+        os.mkdir(self.state)
+        self.index = SiteIndex(os.path.join(self.state, SITE_INDEX_NAME))
+        self.manifest = Manifest(os.path.join(self.state, MANIFEST_NAME))
+        for i in range(10):
+            self.add_page(f"post{i}", 1_700_000_000 + i * 86400)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_page(self, name, mtime, date=None):
+        source = f"/content/{name}.md"
+        self.index.pages[source] = {
+            "output": os.path.join(self.public, name, "index.html"),
+            "title": f"Post <{name}>",
+            "date": date,
+        }
+        self.manifest.files[source] = [1, mtime * 10**9, "digest"]
+
+    def write_sitemap(self):
+        with redirect_stdout(StringIO()):
+            return write_sitemap(
+                self.index, self.manifest, self.public, "https://example.com"
+            )
+
+    def urls(self):
+        urls = []
+        index = ElementTree.parse(os.path.join(self.public, "sitemap.xml"))
+        for loc in index.iter(SITEMAP_NS + "loc"):
+            shard = os.path.join(self.public, loc.text.rsplit("/", 1)[1])
+            urls.extend(
+                url.text for url in ElementTree.parse(shard).iter(SITEMAP_NS + "loc")
+            )
+        return sorted(urls)
+
+    def test_page_url(self):
+        self.assertEqual(
+            page_url("/public/index.html", "/public", "https://a.b/"), "https://a.b/"
+        )
+        self.assertEqual(
+            page_url("/public/blog/index.html", "/public", "https://a.b"),
+            "https://a.b/blog/",
+        )
+        self.assertEqual(
+            page_url("/public/about.html", "/public", "https://a.b"),
+            "https://a.b/about.html",
+        )
+
+    def test_rewrites_only_changed_shards(self):
+        with mock.patch.object(sitemap, "SITEMAP_SHARD_ENTRIES", 2):
+            self.assertEqual(self.write_sitemap(), 8)
+            self.assertEqual(len(self.urls()), 10)
+            self.assertEqual(self.write_sitemap(), 0)
+            self.add_page("new", 1_800_000_000)
+            self.assertEqual(self.write_sitemap(), 1)
+        self.assertIn("https://example.com/new/", self.urls())
+        # Shard digests are kept with the manifest, outside the served tree
+        self.assertTrue(os.path.exists(os.path.join(self.state, SITEMAP_STATE_NAME)))
+        self.assertFalse(os.path.exists(os.path.join(self.public, SITEMAP_STATE_NAME)))
+
+    def test_removes_shards_after_shrinking(self):
+        with mock.patch.object(sitemap, "SITEMAP_SHARD_ENTRIES", 2):
+            self.write_sitemap()
+        self.write_sitemap()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "sitemap-1.xml")))
+        self.assertEqual(len(self.urls()), 10)
+
+    def test_feed_has_newest_dated_pages(self):
+        self.add_page("old", 0, date="2023-01-01")
+        self.add_page("new", 0, date="2024-02-01T10:00:00+02:00")
+        self.add_page("bad", 0, date="yesterday")
+        log = StringIO()
+        with redirect_stdout(log):
+            self.assertTrue(write_feed(self.index, self.public, "https://example.com"))
+            self.assertFalse(write_feed(self.index, self.public, "https://example.com"))
+        self.assertIn("invalid date 'yesterday'", log.getvalue())
+        feed = ElementTree.parse(os.path.join(self.public, "feed.xml"))
+        titles = [title.text for title in feed.iter(ATOM_NS + "title")]
+        self.assertEqual(titles, ["https://example.com", "Post <new>", "Post <old>"])
+        self.assertEqual(
+            feed.find(ATOM_NS + "updated").text, "2024-02-01T10:00:00+02:00"
+        )
+
+    def test_feed_title_and_author(self):
+        with redirect_stdout(StringIO()):
+            write_feed(
+                self.index,
+                self.public,
+                "https://example.com",
+                title="Fan <Club>",
+                author="A. Writer",
+            )
+        feed = ElementTree.parse(os.path.join(self.public, "feed.xml")).getroot()
+        self.assertEqual(feed.find(ATOM_NS + "title").text, "Fan <Club>")
+        self.assertEqual(feed.find(f"{ATOM_NS}author/{ATOM_NS}name").text, "A. Writer")
+        # The author defaults to the title, which defaults to the site URL
+        with redirect_stdout(StringIO()):
+            write_feed(self.index, self.public, "https://example.com")
+        feed = ElementTree.parse(os.path.join(self.public, "feed.xml")).getroot()
+        self.assertEqual(
+            feed.find(f"{ATOM_NS}author/{ATOM_NS}name").text, "https://example.com"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile(self):
+        template = Template("<title>{{ Title }}</title><p>{{Content}}</p>")
+        self.assertEqual(template.segments, ["<title>", "</title><p>", "</p>"])
+        self.assertEqual(template.slots, ["title", "content"])
+
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title>{{ Content }}")
+        self.assertEqual(
+            template.render({"title": "Home", "content": "<p>Hi</p>"}),
+            "<title> Home </title><p>Hi</p>",
+        )
+
+    def test_render_named_placeholders(self):
+        template = Template(
+            '<meta content="{{ Description }}">{{ Date }} {{ Title }} {{ Date }}'
+        )
+        self.assertEqual(
+            template.render(
+                {"title": "Post", "description": "About", "date": "2024-01-01"}
+            ),
+            '<meta content="About">2024-01-01 Post 2024-01-01',
+        )
+
+    def test_render_into_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        content = ParentNode("div", [LeafNode("p", "Hi")])
+        chunks = []
+        template.render_into(chunks.append, {"title": "Home", "content": content})
+        self.assertEqual(
+            chunks, ["<title>", "Home", "</title>", "<div>", "<p>Hi</p>", "</div>", ""]
+        )
+
+    def test_render_missing_placeholder(self):
+        template = Template("<p>{{ Description }}</p>")
+        self.assertEqual(template.render({}), "<p></p>")
+
+    def test_render_no_placeholders(self):
+        self.assertEqual(Template("<p>static</p>").render({}), "<p>static</p>")
+
+    def test_load_template_is_cached_until_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            template = load_template(path)
+            self.assertIs(load_template(path), template)
+            with open(path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path), Template("<h1>{{ Title }}</h1>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -60,6 +60,13 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(leaf_node.value, "")
         self.assertEqual(leaf_node.props, {"src": "https://example.com", "alt": ""})
 
+    def test_text_node_to_html_node_unknown_type(self):
+        with self.assertRaises(Exception):
+            TextNode("This is some text", "underline").text_node_to_html_node()
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("text", "text"), "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
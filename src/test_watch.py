@@ -0,0 +1,122 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from fixtures import SiteTestCase, write_file
+from manifest import Manifest, MANIFEST_NAME
+from site_index import SiteIndex, SITE_INDEX_NAME
+from sitemap import FEED_NAME, SITEMAP_NAME
+from watch import TreeSnapshot, apply_changes
+
+
+class TestTreeSnapshot(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post\n")
+        self.snapshot = TreeSnapshot([self.content])
+
+    def test_files(self):
+        self.assertEqual(
+            sorted(self.snapshot.files(self.content)),
+            [
+                os.path.join(self.content, "index.md"),
+                os.path.join(self.content, "post", "index.md"),
+            ],
+        )
+
+    def test_rescan_modified_file(self):
+        path = os.path.join(self.content, "post", "index.md")
+        write_file(path, "# Post, edited\n")
+        changed, removed, new_dirs = self.snapshot.rescan(
+            [os.path.join(self.content, "post")]
+        )
+        self.assertEqual((changed, removed, new_dirs), ([path], [], []))
+
+    def test_rescan_unchanged(self):
+        self.assertEqual(self.snapshot.rescan([self.content]), ([], [], []))
+
+    def test_rescan_new_directory(self):
+        path = os.path.join(self.content, "new", "index.md")
+        write_file(path, "# New\n")
+        changed, removed, new_dirs = self.snapshot.rescan([self.content])
+        self.assertEqual(changed, [path])
+        self.assertEqual(new_dirs, [os.path.join(self.content, "new")])
+
+    def test_rescan_removed_directory(self):
+        path = os.path.join(self.content, "post", "index.md")
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+        changed, removed, _ = self.snapshot.rescan(self.snapshot.directories())
+        self.assertEqual((changed, removed), ([], [path]))
+        self.assertNotIn(os.path.dirname(path), self.snapshot.directories())
+
+
+class TestApplyChanges(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n")
+        write_file(os.path.join(self.content, "post", "index.md"), "# Post\n")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        os.mkdir(self.public)
+        self.manifest = Manifest(os.path.join(self.public, MANIFEST_NAME))
+        self.snapshot = TreeSnapshot([self.content, self.static])
+
+    def apply(self, changed, removed=(), template_changed=False, **kwargs):
+        with redirect_stdout(StringIO()):
+            return apply_changes(
+                changed,
+                removed,
+                template_changed,
+                self.snapshot,
+                self.content,
+                self.static,
+                self.template,
+                self.public,
+                self.manifest,
+                **kwargs,
+            )
+
+    def test_page_change_rebuilds_one_page(self):
+        outputs = self.apply([os.path.join(self.content, "post", "index.md")])
+        self.assertEqual(outputs, [os.path.join(self.public, "post", "index.html")])
+
+    def test_template_change_rebuilds_pages_only(self):
+        outputs = self.apply([], template_changed=True)
+        self.assertEqual(
+            sorted(outputs),
+            [
+                os.path.join(self.public, "index.html"),
+                os.path.join(self.public, "post", "index.html"),
+            ],
+        )
+
+    def test_static_change_and_removal(self):
+        css = os.path.join(self.static, "index.css")
+        self.assertEqual(self.apply([css]), [os.path.join(self.public, "index.css")])
+        self.assertEqual(
+            self.apply([], removed=[css]), [os.path.join(self.public, "index.css")]
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_page_changes_refresh_sitemap_and_feed(self):
+        site_index = SiteIndex(os.path.join(self.public, SITE_INDEX_NAME))
+        site = {"site_index": site_index, "site_url": "https://example.com"}
+        sitemap = os.path.join(self.public, SITEMAP_NAME)
+        self.apply([os.path.join(self.static, "index.css")], **site)
+        self.assertFalse(os.path.exists(sitemap))
+        self.apply([os.path.join(self.content, "post", "index.md")], **site)
+        with open(sitemap) as f:
+            self.assertIn("sitemap-0.xml", f.read())
+        self.assertTrue(os.path.exists(os.path.join(self.public, FEED_NAME)))
+
+    def test_bad_page_does_not_stop_rebuild(self):
+        bad = os.path.join(self.content, "index.md")
+        write_file(bad, "# Home\n\n**unclosed\n")
+        outputs = self.apply([bad, os.path.join(self.static, "index.css")])
+        self.assertEqual(outputs, [os.path.join(self.public, "index.css")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,8 @@ class TextNode:
     text_type_image = "image"
     text_type_link = "link"
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -27,25 +29,22 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
 
     def text_node_to_html_node(self):
-        types = {
-            "text": {"tag": None, "value": self.text},
-            "bold": {"tag": "b", "value": self.text},
-            "italic": {"tag": "i", "value": self.text},
-            "code": {"tag": "code", "value": self.text},
-            "link": {
-                "tag": "a",
-                "props": {"href": self.url},
-                "value": self.text,
-            },
-            "image": {
-                "tag": "img",
-                "value": "",
-                "props": {"src": self.url, "alt": ""},
-            },
-        }
-
-        if self.text_type not in types:
+        convert = TEXT_NODE_CONVERSIONS.get(self.text_type)
+        if convert is None:
             raise Exception("Text type not found")
-
-        kwargs = types[self.text_type]
-        return LeafNode(**kwargs)
+        return convert(self)
+
+
+# Built once at import rather than on every text_node_to_html_node call
+TEXT_NODE_CONVERSIONS = {
+    TextNode.text_type_text: lambda node: LeafNode(None, node.text),
+    TextNode.text_type_bold: lambda node: LeafNode("b", node.text),
+    TextNode.text_type_italic: lambda node: LeafNode("i", node.text),
+    TextNode.text_type_code: lambda node: LeafNode("code", node.text),
+    TextNode.text_type_link: lambda node: LeafNode(
+        "a", node.text, {"href": node.url}
+    ),
+    TextNode.text_type_image: lambda node: LeafNode(
+        "img", "", {"src": node.url, "alt": ""}
+    ),
+}
@@ -0,0 +1,388 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import time
+import urllib.request
+
+from copy_static import copy_static_file, stat_digest
+from generate_page import generate_page, page_digest
+from plan import page_output_name
+from sitemap import write_feed, write_sitemap
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+# Wait for this long without new events before rebuilding, so an editor's
+# write-rename-chmod sequence results in a single rebuild
+DEBOUNCE_SECONDS = 0.05
+
+
+class InotifyWatcher:
+    # Blocks until something changes in one of the watched directories and
+    # reports which directories those were. Linux only, via libc.
+    name = "inotify"
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.directories = {}
+
+    def add(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self.directories[wd] = directory
+
+    def wait(self, timeout=None, debounce=DEBOUNCE_SECONDS):
+        # Returns the set of directories with events, or None if the kernel
+        # queue overflowed and everything has to be rescanned
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        changed = set()
+        overflow = False
+        while ready:
+            data = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif wd in self.directories:
+                    changed.add(self.directories[wd])
+                if mask & IN_IGNORED:
+                    self.directories.pop(wd, None)
+            ready, _, _ = select.select([self.fd], [], [], debounce)
+        return None if overflow else changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    # Fallback for platforms without inotify: every wait asks for a full rescan
+    name = "polling"
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+
+    def add(self, directory):
+        pass
+
+    def wait(self, timeout=None, debounce=DEBOUNCE_SECONDS):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return None
+
+    def close(self):
+        pass
+
+
+def make_watcher(poll_interval=0.5):
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError, TypeError):
+        # No libc inotify (macOS, Windows) or the instance limit was reached
+        return PollingWatcher(poll_interval)
+
+
+class TreeSnapshot:
+    # Directory listings with each file's size and mtime. Rescanning only the
+    # directories an event came from keeps change detection proportional to
+    # the edit, not to the size of the tree.
+    def __init__(self, roots):
+        self.listings = {}
+        for root in roots:
+            self._add_tree(root, [], [])
+
+    def directories(self):
+        return set(self.listings)
+
+    def files(self, root):
+        prefix = os.path.join(root, "")
+        for directory, listing in self.listings.items():
+            if directory == root or directory.startswith(prefix):
+                for name, (is_dir, _, _) in listing.items():
+                    if not is_dir:
+                        yield os.path.join(directory, name)
+
+    def rescan(self, directories):
+        # Returns (changed files, removed files, new directories)
+        changed, removed, new_directories = [], [], []
+        for directory in sorted(directories):
+            if directory not in self.listings:
+                continue
+            old = self.listings[directory]
+            new = _list_directory(directory)
+            self.listings[directory] = new
+            for name, entry in new.items():
+                path = os.path.join(directory, name)
+                if old.get(name) == entry:
+                    continue
+                if name in old and old[name][0] != entry[0]:
+                    self._remove(path, old[name], removed)
+                if entry[0]:
+                    if name not in old or not old[name][0]:
+                        self._add_tree(path, changed, new_directories)
+                else:
+                    changed.append(path)
+            for name, entry in old.items():
+                if name not in new:
+                    self._remove(os.path.join(directory, name), entry, removed)
+        return changed, removed, new_directories
+
+    def _add_tree(self, directory, changed, new_directories):
+        listing = _list_directory(directory)
+        self.listings[directory] = listing
+        new_directories.append(directory)
+        for name, (is_dir, _, _) in listing.items():
+            path = os.path.join(directory, name)
+            if is_dir:
+                self._add_tree(path, changed, new_directories)
+            else:
+                changed.append(path)
+
+    def _remove(self, path, entry, removed):
+        if not entry[0]:
+            removed.append(path)
+            return
+        for name, child in self.listings.pop(path, {}).items():
+            self._remove(os.path.join(path, name), child, removed)
+
+
+class SourceTracker:
+    # The content and static trees and the template as last seen, kept current
+    # by a watcher so each check only rescans the directories that had events
+    def __init__(self, content_dir, static_dir, template_path, poll_interval=0.5):
+        self.template_path = template_path
+        self.snapshot = TreeSnapshot([content_dir, static_dir])
+        self.watcher = make_watcher(poll_interval)
+        for directory in sorted(self.snapshot.directories()):
+            self.watcher.add(directory)
+        # Watch the template's directory rather than the file itself, since
+        # editors often save by replacing the file
+        self.watcher.add(os.path.dirname(os.path.abspath(template_path)))
+        self.template_key = _stat_key(template_path)
+
+    def changes(self, timeout=None, debounce=DEBOUNCE_SECONDS):
+        # Returns (changed files, removed files, whether the template changed),
+        # or None if nothing changed within timeout
+        directories = self.watcher.wait(timeout, debounce)
+        if directories is not None and not directories:
+            return None
+        if directories is None:
+            directories = self.snapshot.directories()
+        changed, removed, new_directories = self.snapshot.rescan(directories)
+        for directory in new_directories:
+            self.watcher.add(directory)
+        template_key = _stat_key(self.template_path)
+        template_changed = template_key != self.template_key
+        self.template_key = template_key
+        if not (changed or removed or template_changed):
+            return None
+        return changed, removed, template_changed
+
+    def close(self):
+        self.watcher.close()
+
+
+def _list_directory(directory):
+    listing = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    # A directory's own mtime changes with its contents, which
+                    # are tracked separately
+                    listing[entry.name] = (True, 0, 0)
+                else:
+                    stat = entry.stat()
+                    listing[entry.name] = (False, stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return listing
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def page_output(path, content_dir, public_dir):
+    rel_path = os.path.relpath(path, content_dir)
+    return os.path.join(public_dir, page_output_name(rel_path))
+
+
+def static_output(path, static_dir, public_dir):
+    return os.path.join(public_dir, os.path.relpath(path, static_dir))
+
+
+def apply_changes(
+    changed,
+    removed,
+    template_changed,
+    snapshot,
+    content_dir,
+    static_dir,
+    template_path,
+    public_dir,
+    manifest,
+    cache=None,
+    site_index=None,
+    site_url=None,
+    site_title=None,
+    site_author=None,
+):
+    # Rebuild only the outputs affected by the given source changes and
+    # return the output paths that were written or deleted. With a site index
+    # and site_url, the sitemap and feed follow whenever pages changed.
+    content_prefix = os.path.join(content_dir, "")
+    static_prefix = os.path.join(static_dir, "")
+    pages = {path for path in changed if path.startswith(content_prefix)}
+    static_files = {path for path in changed if path.startswith(static_prefix)}
+    if template_changed:
+        # Every page embeds the template; static files don't depend on it
+        pages.update(snapshot.files(content_dir))
+
+    outputs = []
+    for path in sorted(removed):
+        output = manifest.remove(path)
+        if site_index is not None:
+            site_index.remove(path)
+        if output is not None:
+            outputs.append(output)
+    for path in sorted(pages):
+        dest_path = page_output(path, content_dir, public_dir)
+        try:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            metadata = generate_page(path, template_path, dest_path, cache=cache)
+        except Exception as e:
+            # Keep watching; the page is retried on its next save
+            print(f"Error generating page {path}: {type(e).__name__}: {e}")
+            continue
+        manifest.record(path, page_digest(manifest, path, template_path), dest_path)
+        if site_index is not None:
+            site_index.update(path, dest_path, manifest.hash(path), metadata)
+        outputs.append(dest_path)
+    for path in sorted(static_files):
+        dest_path = static_output(path, static_dir, public_dir)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        print(f"Copying static file {path} to {os.path.dirname(dest_path)}")
+        copy_static_file(path, dest_path)
+        manifest.record(path, stat_digest(os.stat(path)), dest_path)
+        outputs.append(dest_path)
+    manifest.save()
+    if site_index is not None:
+        site_index.save()
+    pages_removed = any(path.startswith(content_prefix) for path in removed)
+    if (pages or pages_removed) and site_index is not None and site_url:
+        write_sitemap(site_index, manifest, public_dir, site_url)
+        write_feed(
+            site_index, public_dir, site_url, title=site_title, author=site_author
+        )
+    return outputs
+
+
+def watch(
+    content_dir,
+    static_dir,
+    template_path,
+    public_dir,
+    manifest,
+    on_rebuild=None,
+    poll_interval=0.5,
+    cache=None,
+    site_index=None,
+    site_url=None,
+    site_title=None,
+    site_author=None,
+):
+    # Keeps the process (and with it the compiled template and imports) warm
+    # and rebuilds affected outputs whenever a source changes. on_rebuild is
+    # called with the list of output paths that changed.
+    content_dir = os.path.normpath(content_dir)
+    static_dir = os.path.normpath(static_dir)
+    tracker = SourceTracker(content_dir, static_dir, template_path, poll_interval)
+
+    print(
+        f"Watching {content_dir}, {static_dir} and {template_path} "
+        f"for changes ({tracker.watcher.name}), press Ctrl+C to stop"
+    )
+    try:
+        while True:
+            changes = tracker.changes()
+            if changes is None:
+                continue
+            start = time.perf_counter()
+            changed, removed, template_changed = changes
+            outputs = apply_changes(
+                changed,
+                removed,
+                template_changed,
+                tracker.snapshot,
+                content_dir,
+                static_dir,
+                template_path,
+                public_dir,
+                manifest,
+                cache,
+                site_index,
+                site_url,
+                site_title,
+                site_author,
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {len(outputs)} output(s) in {elapsed_ms:.1f} ms")
+            if on_rebuild is not None and outputs:
+                on_rebuild(outputs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.close()
+
+
+def live_reload_notifier(url, public_dir):
+    # on_rebuild callback that tells a `server.py --live-reload` instance which
+    # URL paths changed, so only browsers showing those pages reload
+    def notify(outputs):
+        paths = [
+            "/" + os.path.relpath(output, public_dir).replace(os.sep, "/")
+            for output in outputs
+        ]
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(paths).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            urllib.request.urlopen(request, timeout=2).close()
+        except OSError as e:
+            print(f"Could not notify live reload server at {url}: {e}")
+
+    return notify